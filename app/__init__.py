@@ -1,45 +1,132 @@
 import os
+import json
+import threading
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv  # Import the load_dotenv function
 from datetime import timedelta
+from app.hashing import PasswordHasher
+from app.blocklist import TokenBlocklist
+from app.cache import ResponseCache
+from app.events import AvailabilityBroker
+from app.serialization import json_provider_class
+from app.instrumentation import QueryInstrumentation
+from app.metrics import Metrics
+from app.pooling import engine_options_from_env, env_flag
+from app.replicas import ReplicaRouter, RoutingSession
 # Load environment variables from .env file
 load_dotenv()
 
 # Initialize extensions
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = None  # Created in create_app; Flask-Migrate pulls in Alembic, which fast boot skips
 jwt = JWTManager()
+hasher = PasswordHasher()
+blocklist = TokenBlocklist()
+response_cache = ResponseCache()
+availability_events = AvailabilityBroker()
+query_instrumentation = QueryInstrumentation()
+metrics = Metrics()
+replica_router = ReplicaRouter()
+
+
+def _register_blueprints(app):
+    from app.routes import auth, books, users
+    app.register_blueprint(auth.bp)
+    app.register_blueprint(books.bp)
+    app.register_blueprint(users.bp)
+
+
+class _LazyBlueprints:
+    """WSGI wrapper that imports and registers the blueprints when the first request arrives."""
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self.registered = False
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if not self.registered:
+            with self._lock:
+                if not self.registered:
+                    _register_blueprints(self.app)
+                    self.registered = True
+        return self.wsgi_app(environ, start_response)
+
+
+def _init_migrate(app):
+    global migrate
+    from flask_migrate import Migrate
+    if migrate is None:
+        migrate = Migrate()
+    migrate.init_app(app, db)
+
 
 def create_app():
    
     app = Flask(__name__)
+    app.json = json_provider_class(os.getenv('JSON_PROVIDER'))(app)
     # Configure the app with environment variables
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URI')
+    # Fast boot trusts migrations, never connects before the first request and defers
+    # route imports to it; run `flask create-tables` and `flask db upgrade` without it
+    app.config['FAST_BOOT'] = env_flag('FAST_BOOT')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_from_env(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['DATABASE_REPLICA_URIS'] = [uri.strip() for uri in os.getenv('DATABASE_REPLICA_URIS', '').split(',') if uri.strip()]
+    app.config['REPLICA_STICKY_SECONDS'] = float(os.getenv('REPLICA_STICKY_SECONDS', 5))
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(seconds=3000)
+    app.config['PASSWORD_HASH_BACKEND'] = os.getenv('PASSWORD_HASH_BACKEND', 'pbkdf2')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    app.config['TOKEN_BLOCKLIST_BACKEND'] = os.getenv('TOKEN_BLOCKLIST_BACKEND', 'memory')
+    app.config['TOKEN_BLOCKLIST_SYNC_INTERVAL'] = float(os.getenv('TOKEN_BLOCKLIST_SYNC_INTERVAL', 5))
+    app.config['CATALOG_CACHE_SIZE'] = int(os.getenv('CATALOG_CACHE_SIZE', 256))
+    app.config['CATALOG_CACHE_TTL'] = float(os.getenv('CATALOG_CACHE_TTL', 5))
+    app.config['SEARCH_INDEX_TTL'] = float(os.getenv('SEARCH_INDEX_TTL', 60))
+    app.config['AVAILABILITY_EVENTS_BACKEND'] = os.getenv('AVAILABILITY_EVENTS_BACKEND', 'local')
+    app.config['AVAILABILITY_EVENTS_MAX_STREAMS'] = int(os.getenv('AVAILABILITY_EVENTS_MAX_STREAMS', 0))
+    if env_flag('DB_PGBOUNCER') and app.config['AVAILABILITY_EVENTS_BACKEND'] == 'postgres':
+        # LISTEN is session state, which transaction pooling does not keep
+        raise ValueError('AVAILABILITY_EVENTS_BACKEND=postgres cannot run through PgBouncer')
+    app.config['SQL_SLOW_QUERY_MS'] = float(os.getenv('SQL_SLOW_QUERY_MS', 100))
+    app.config['SQL_QUERY_BUDGET'] = int(os.getenv('SQL_QUERY_BUDGET', 0))
+    app.config['SQL_QUERY_BUDGET_RAISE'] = env_flag('SQL_QUERY_BUDGET_RAISE')
+    app.config['SQL_LOG_REQUESTS'] = env_flag('SQL_LOG_REQUESTS')
+    app.config['FINE_RATES'] = json.loads(os.getenv('FINE_RATES', '{"default": {"rate": 1, "cap": null}}'))
 
     # Initialize extensions with the app
+    metrics.init_app(app)  # Before db so its pool class is used by the engine
+    replica_router.init_app(app)  # Before db so the replica binds get engines
     db.init_app(app)
-    migrate.init_app(app, db)
+    if not app.config['FAST_BOOT']:
+        _init_migrate(app)
     jwt.init_app(app)
+    hasher.init_app(app)
+    blocklist.init_app(app)
+    response_cache.init_app(app)
+    availability_events.init_app(app)
+    query_instrumentation.init_app(app)
     
     # Register blueprints
-    from app.routes import auth, books, users
-    app.register_blueprint(auth.bp)
-    app.register_blueprint(books.bp)
-    app.register_blueprint(users.bp)
-    
-    
-    
-    with app.app_context():
-        try:
-            db.create_all()
-        except Exception as e:
-            print(f"Error creating tables: {e}")
+    if app.config['FAST_BOOT']:
+        app.wsgi_app = _LazyBlueprints(app)
+    else:
+        _register_blueprints(app)
+
+    # Register CLI commands
+    from app.commands import accrue_fines, create_tables
+    app.cli.add_command(accrue_fines)
+    app.cli.add_command(create_tables)
+
+    if not app.config['FAST_BOOT']:
+        with app.app_context():
+            try:
+                db.create_all()
+            except Exception:
+                app.logger.exception('Error creating tables')
 
     return app
 
@@ -0,0 +1,156 @@
+import hashlib
+import heapq
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys: no false negatives, tunable false positives."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class MemoryBlocklistStore:
+    """Process-local store; entries are dropped once their token has expired."""
+
+    def __init__(self):
+        self._entries = {}
+        self._expiry = []
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        while self._expiry and self._expiry[0][0] <= now:
+            exp, jti = heapq.heappop(self._expiry)
+            if self._entries.get(jti) == exp:
+                del self._entries[jti]
+
+    def add(self, jti, exp):
+        exp = exp if exp is not None else math.inf
+        with self._lock:
+            self._evict(time.time())
+            self._entries[jti] = exp
+            heapq.heappush(self._expiry, (exp, jti))
+
+    def __contains__(self, jti):
+        exp = self._entries.get(jti)
+        return exp is not None and exp > time.time()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def live_jtis(self):
+        now = time.time()
+        return [jti for jti, exp in list(self._entries.items()) if exp > now]
+
+
+class SQLBlocklistStore:
+    """Shared store backed by the revoked_token table, for multi-worker deployments."""
+
+    def add(self, jti, exp):
+        from app import db
+        from app.models import RevokedToken
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        expires_at = datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None) if exp is not None else None
+        db.session.execute(db.delete(RevokedToken).where(RevokedToken.expires_at <= now))
+        db.session.merge(RevokedToken(jti=jti, expires_at=expires_at))
+        db.session.commit()
+
+    def __contains__(self, jti):
+        from app import db
+        from app.models import RevokedToken
+
+        return db.session.get(RevokedToken, jti) is not None
+
+    def live_jtis(self):
+        from app import db
+        from app.models import RevokedToken
+
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return db.session.scalars(
+            db.select(RevokedToken.jti).where(
+                db.or_(RevokedToken.expires_at.is_(None), RevokedToken.expires_at > now)
+            )
+        ).all()
+
+
+class TokenBlocklist:
+    """Tracks revoked JWTs until they expire.
+
+    TOKEN_BLOCKLIST_BACKEND is 'memory' (single process) or 'sql' (shared across
+    workers). With the sql backend an in-process Bloom filter, rebuilt from the
+    table every TOKEN_BLOCKLIST_SYNC_INTERVAL seconds, answers the common
+    not-revoked case without a database round trip; tokens revoked by another
+    worker are therefore seen within one sync interval. An interval of 0 always
+    consults the table.
+    """
+
+    def __init__(self, app=None):
+        self.store = MemoryBlocklistStore()
+        self.sync_interval = 0
+        self.capacity = 0
+        self._bloom = None
+        self._synced_at = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.setdefault('TOKEN_BLOCKLIST_BACKEND', 'memory')
+        self.sync_interval = app.config.setdefault('TOKEN_BLOCKLIST_SYNC_INTERVAL', 5)
+        self.capacity = app.config.setdefault('TOKEN_BLOCKLIST_BLOOM_CAPACITY', 100_000)
+        if backend == 'memory':
+            self.store = MemoryBlocklistStore()
+        elif backend == 'sql':
+            self.store = SQLBlocklistStore()
+        else:
+            raise ValueError(f'Unknown TOKEN_BLOCKLIST_BACKEND: {backend}')
+        self._bloom = None
+        self._synced_at = 0
+        app.extensions['token_blocklist'] = self
+
+    def _use_bloom(self):
+        return isinstance(self.store, SQLBlocklistStore) and self.sync_interval > 0
+
+    def _refresh_bloom(self):
+        with self._lock:
+            if self._bloom is not None and time.monotonic() - self._synced_at < self.sync_interval:
+                return
+            jtis = self.store.live_jtis()
+            bloom = BloomFilter(max(self.capacity, 2 * len(jtis)))
+            for jti in jtis:
+                bloom.add(jti)
+            self._bloom = bloom
+            self._synced_at = time.monotonic()
+
+    def revoke(self, jti, exp=None):
+        self.store.add(jti, exp)
+        if self._bloom is not None:
+            self._bloom.add(jti)
+
+    def is_revoked(self, jti):
+        if self._use_bloom():
+            if self._bloom is None or time.monotonic() - self._synced_at >= self.sync_interval:
+                self._refresh_bloom()
+            if jti not in self._bloom:
+                return False
+        return jti in self.store
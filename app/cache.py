@@ -0,0 +1,96 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+
+
+class ResponseCache:
+    """In-process LRU of serialized catalog responses, keyed by request path.
+
+    Entries are tied to the catalog version, which the book write routes bump,
+    and additionally expire after CATALOG_CACHE_TTL seconds so that writes made
+    by other worker processes become visible. ETags are a hash of the body, so
+    they stay valid across workers and restarts.
+    """
+
+    def __init__(self, app=None):
+        self.version = 0
+        self.maxsize = 0
+        self.ttl = 0
+        self.max_entry_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.maxsize = app.config.setdefault('CATALOG_CACHE_SIZE', 256)
+        self.ttl = app.config.setdefault('CATALOG_CACHE_TTL', 5)
+        self.max_entry_bytes = app.config.setdefault('CATALOG_CACHE_MAX_ENTRY_BYTES', 1024 * 1024)
+        app.extensions['response_cache'] = self
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['version'] != self.version or entry['expires'] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, mimetype, version):
+        entry = {
+            'etag': hashlib.blake2b(body, digest_size=16).hexdigest(),
+            'body': body,
+            'mimetype': mimetype,
+            'version': version,
+            'expires': time.monotonic() + self.ttl,
+        }
+        if self.maxsize and len(body) <= self.max_entry_bytes:
+            with self._lock:
+                if version == self.version:
+                    self._entries[key] = entry
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+        return entry
+
+
+def cached_response(cache, unless=None):
+    """Serve a GET view from `cache` with a strong ETag, answering If-None-Match with 304.
+
+    Requests for which `unless()` returns true bypass the cache entirely.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if unless is not None and unless():
+                return view(*args, **kwargs)
+            key = request.full_path
+            entry = cache.get(key)
+            if entry is None:
+                # Read the version first so a write racing this build can't be cached as current
+                version = cache.version
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                entry = cache.put(key, response.get_data(), response.mimetype, version)
+
+            response = current_app.response_class(entry['body'], mimetype=entry['mimetype'])
+            response.set_etag(entry['etag'])
+            return response.make_conditional(request)
+
+        return wrapper
+
+    return decorator
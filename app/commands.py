@@ -0,0 +1,120 @@
+import json
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from app import db
+from app.models import Books, BorrowedBook, FineLedger
+
+np = None  # Imported on first use so booting the web app doesn't pay for numpy
+
+
+def _require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # numpy is only needed by the fine accrual job
+            raise click.ClickException('accrue-fines requires numpy to be installed')
+        np = numpy
+
+
+def _genre_terms(genres, rates):
+    # Factorize genres, look up (rate, cap) once per distinct genre, then broadcast back per loan
+    default = rates.get('default', {})
+    codes = {}
+    inverse = np.fromiter((codes.setdefault(genre or '', len(codes)) for genre in genres), dtype=np.intp, count=len(genres))
+    terms = [rates.get(genre, default) for genre in codes]
+    rate = np.array([term.get('rate', default.get('rate', 1)) for term in terms], dtype=np.float64)[inverse]
+    cap = np.array([np.inf if term.get('cap') is None else term['cap'] for term in terms], dtype=np.float64)[inverse]
+    return rate, cap
+
+
+def compute_fines(due_dates, return_dates, genres, rates, now):
+    """Vectorized equivalent of BorrowedBook.calculate_fine, with per-genre rates and caps.
+
+    Open loans accrue up to `now`, returned loans up to their return date.
+    Returns (days_overdue, amounts) as NumPy arrays.
+    """
+    _require_numpy()
+    due = np.array(due_dates, dtype='datetime64[us]')
+    returned = np.array(return_dates, dtype='datetime64[us]')
+    end = np.where(np.isnat(returned), np.datetime64(now, 'us'), returned)
+    days = np.maximum((end - due) // np.timedelta64(1, 'D'), 0).astype(np.int64)
+    rate, cap = _genre_terms(genres, rates)
+    return days, np.round(np.minimum(days * rate, cap), 2)
+
+
+@click.command('create-tables')
+@with_appcontext
+def create_tables():
+    """Create any missing tables; migrations only add to tables that already exist."""
+    db.create_all()
+    click.echo('Tables created.')
+
+
+@click.command('accrue-fines')
+@click.option('--chunk-size', default=50000, show_default=True, help='Loans processed per batch.')
+@click.option('--returned-within', default=30, show_default=True, help='Also settle loans returned in the last N days.')
+@click.option('--rates', default=None, help='JSON of per-genre {"rate", "cap"}, with a "default" entry; overrides FINE_RATES.')
+@with_appcontext
+def accrue_fines(chunk_size, returned_within, rates):
+    """Recompute the fines ledger for open and recently returned loans."""
+    _require_numpy()
+    rates = json.loads(rates) if rates else current_app.config['FINE_RATES']
+    now = datetime.now()
+    query = (
+        db.select(BorrowedBook.id, BorrowedBook.users_id, BorrowedBook.due_date, BorrowedBook.return_date, Books.genre)
+        .join(Books, Books.id == BorrowedBook.books_id)
+        .where(db.or_(BorrowedBook.return_date.is_(None), BorrowedBook.return_date >= now - timedelta(days=returned_within)))
+        .where(BorrowedBook.due_date < now)
+        .order_by(BorrowedBook.id)
+        .limit(chunk_size)
+    )
+
+    last_id, written, cleared = 0, 0, 0
+    while True:
+        rows = db.session.execute(query.where(BorrowedBook.id > last_id)).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        loan_ids, users_ids, due_dates, return_dates, genres = zip(*rows)
+        days, amounts = compute_fines(due_dates, return_dates, genres, rates, now)
+
+        existing = dict(db.session.execute(
+            db.select(FineLedger.borrowed_book_id, FineLedger.id)
+            .where(FineLedger.borrowed_book_id.between(loan_ids[0], last_id))  # The chunk is in id order
+        ).all())
+        inserts, updates, deletes = [], [], []
+        for i, loan_id in enumerate(loan_ids):
+            if amounts[i] <= 0:
+                # A rate, cap or due date change can waive a fine that was already recorded
+                if loan_id in existing:
+                    deletes.append(existing[loan_id])
+                continue
+            entry = {'days_overdue': int(days[i]), 'amount': float(amounts[i]), 'computed_at': now}
+            if loan_id in existing:
+                updates.append(dict(entry, id=existing[loan_id]))
+            else:
+                inserts.append(dict(entry, borrowed_book_id=loan_id, users_id=users_ids[i]))
+        if inserts:
+            db.session.execute(db.insert(FineLedger), inserts)
+        if updates:
+            db.session.execute(db.update(FineLedger), updates)
+        if deletes:
+            db.session.execute(db.delete(FineLedger).where(FineLedger.id.in_(deletes)))
+        db.session.commit()
+        written += len(inserts) + len(updates)
+        cleared += len(deletes)
+        click.echo(f'Processed loans up to id {last_id}, {written} fines written, {cleared} cleared')
+
+    # Loans whose due date moved into the future are no longer selected above, so clear their fines here
+    not_due = db.session.execute(
+        db.delete(FineLedger)
+        .where(FineLedger.borrowed_book_id.in_(db.select(BorrowedBook.id).where(BorrowedBook.due_date >= now)))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    cleared += not_due.rowcount
+
+    click.echo(f'Done: {written} fines written, {cleared} cleared')
@@ -0,0 +1,199 @@
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+
+class StreamLimitReached(RuntimeError):
+    pass
+
+
+class Subscription:
+    def __init__(self, book_ids=None, genres=None, maxsize=1000):
+        self.book_ids = book_ids
+        self.genres = genres
+        self.events = queue.Queue(maxsize=maxsize)
+        self.lost = False
+
+    def wants(self, event):
+        if self.book_ids and event['book_id'] not in self.book_ids:
+            return False
+        if self.genres and event.get('genre') not in self.genres:
+            return False
+        return True
+
+
+class AvailabilityBroker:
+    """Fans book availability changes out to server-sent event subscribers.
+
+    With AVAILABILITY_EVENTS_BACKEND='local' events only reach subscribers of the
+    worker that made the change. With 'postgres' they are published through
+    NOTIFY and each worker with subscribers LISTENs, so every kiosk sees every
+    change regardless of which worker it is connected to.
+
+    Every open stream holds a server thread for as long as the client stays
+    connected, so serve the app with a threaded or green worker class (gunicorn
+    -k gthread or -k gevent) sized for the expected kiosks plus normal traffic.
+    AVAILABILITY_EVENTS_MAX_STREAMS caps the streams per worker so they cannot
+    take every thread; 0 leaves them uncapped.
+
+    If the LISTEN connection drops, every subscriber is told to resync and the
+    listener reconnects with exponential backoff. The listener speaks to
+    psycopg2 and psycopg 3 connections; other Postgres drivers are refused.
+    """
+
+    CHANNEL = 'book_availability'
+    LISTEN_DRIVERS = ('postgresql', 'postgresql+psycopg2', 'postgresql+psycopg')
+    RECONNECT_MIN_SECONDS = 1
+    RECONNECT_MAX_SECONDS = 30
+
+    def __init__(self, app=None):
+        self.backend = 'local'
+        self.max_streams = 0
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._listener = None
+        self._engine = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = app.config.setdefault('AVAILABILITY_EVENTS_BACKEND', 'local')
+        if self.backend not in ('local', 'postgres'):
+            raise ValueError(f'Unknown AVAILABILITY_EVENTS_BACKEND: {self.backend}')
+        if self.backend == 'postgres':
+            drivername = make_url(app.config['SQLALCHEMY_DATABASE_URI']).drivername
+            if drivername not in self.LISTEN_DRIVERS:
+                raise ValueError(f'AVAILABILITY_EVENTS_BACKEND=postgres cannot listen through {drivername}')
+        self.max_streams = app.config.setdefault('AVAILABILITY_EVENTS_MAX_STREAMS', 0)
+        app.extensions['availability_events'] = self
+
+    def subscribe(self, book_ids=None, genres=None):
+        subscription = Subscription(book_ids, genres)
+        with self._lock:
+            if self.max_streams and len(self._subscriptions) >= self.max_streams:
+                raise StreamLimitReached(f'{self.max_streams} availability streams are already open')
+            self._subscriptions.add(subscription)
+        if self.backend == 'postgres':
+            self._ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def _dispatch(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.wants(event):
+                try:
+                    subscription.events.put_nowait(event)
+                except queue.Full:
+                    # A stalled client is told to resync rather than holding unbounded memory
+                    subscription.lost = True
+
+    def _resync_all(self):
+        # Events may have been missed, so every subscriber must refetch availability
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.lost = True
+            try:
+                subscription.events.put_nowait(None)  # Wakes the stream now rather than at its next keepalive
+            except queue.Full:
+                pass
+
+    def publish(self, events):
+        """Deliver committed availability changes; call after the write has committed."""
+        if not events:
+            return
+        if self.backend == 'local':
+            for event in events:
+                self._dispatch(event)
+            return
+        from app import db
+
+        # The change is already committed, so a failed notification must not fail the request
+        try:
+            with db.engine.connect() as connection:
+                for event in events:
+                    connection.execute(db.text('SELECT pg_notify(:channel, :payload)'),
+                                       {'channel': self.CHANNEL, 'payload': json.dumps(event)})
+                connection.commit()
+        except Exception:
+            logger.exception('Failed to publish availability events')
+
+    def publish_books(self, book_ids, reason):
+        """Publish the current availability of `book_ids` after a borrow or return."""
+        if not book_ids or (self.backend == 'local' and not self._subscriptions):
+            return
+        from app import db
+        from app.models import Books
+
+        try:
+            rows = db.session.execute(
+                db.select(Books.id, Books.genre, Books.available_count, Books.is_available)
+                .where(Books.id.in_(set(book_ids)))
+            ).all()
+        except Exception:
+            logger.exception('Failed to load availability for %s event', reason)
+            return
+        self.publish([
+            {'book_id': row.id, 'genre': row.genre, 'available_count': row.available_count,
+             'is_available': row.is_available, 'reason': reason}
+            for row in rows
+        ])
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            from app import db
+
+            self._engine = db.engine
+            self._listener = threading.Thread(target=self._listen, name='availability-listener', daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        delay = self.RECONNECT_MIN_SECONDS
+        while True:
+            connected_at = time.monotonic()
+            try:
+                self._listen_once()
+            except Exception:
+                if time.monotonic() - connected_at > self.RECONNECT_MAX_SECONDS:
+                    delay = self.RECONNECT_MIN_SECONDS  # It had been up for a while, so start the backoff over
+                logger.exception('Availability listener lost its connection; reconnecting in %ss', delay)
+            self._resync_all()
+            time.sleep(delay)
+            delay = min(delay * 2, self.RECONNECT_MAX_SECONDS)
+
+    def _listen_once(self):
+        connection = self._engine.raw_connection()
+        try:
+            dbapi_connection = connection.driver_connection
+            dbapi_connection.autocommit = True
+            dbapi_connection.cursor().execute(f'LISTEN {self.CHANNEL}')
+            while True:
+                if self._engine.dialect.driver == 'psycopg':
+                    # psycopg 3 yields notifications from a generator that blocks until the next one
+                    for notify in dbapi_connection.notifies():
+                        self._dispatch(json.loads(notify.payload))
+                    continue
+                if select.select([dbapi_connection], [], [], 30) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    self._dispatch(json.loads(dbapi_connection.notifies.pop(0).payload))
+        except Exception:
+            connection.invalidate()  # Never hand a dead connection back to the pool
+            raise
+        finally:
+            connection.close()
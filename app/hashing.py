@@ -0,0 +1,101 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+try:
+    import argon2
+except ImportError:  # argon2-cffi is optional; pbkdf2 keeps working without it
+    argon2 = None
+
+PBKDF2_METHOD = f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+BACKENDS = ('pbkdf2', 'argon2')
+
+
+def _argon2_hasher():
+    if argon2 is None:
+        raise RuntimeError('argon2 backend requires argon2-cffi to be installed')
+    return argon2.PasswordHasher()
+
+
+# These run inside the worker processes, so they must stay module-level and picklable
+def _hash(backend, password):
+    if backend == 'argon2':
+        return _argon2_hasher().hash(password)
+    return generate_password_hash(password, method=PBKDF2_METHOD)
+
+
+def _verify(backend, stored_hash, password):
+    """Return (matches, needs_rehash) for a stored hash under the configured backend."""
+    if stored_hash.startswith('$argon2'):
+        hasher = _argon2_hasher()
+        try:
+            hasher.verify(stored_hash, password)
+        except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+            return False, False
+        return True, backend != 'argon2' or hasher.check_needs_rehash(stored_hash)
+
+    if not check_password_hash(stored_hash, password):
+        return False, False
+    return True, backend != 'pbkdf2' or stored_hash.split('$', 1)[0] != PBKDF2_METHOD
+
+
+class PasswordHasher:
+    """Runs password hashing off the request thread in a pool of worker processes.
+
+    PASSWORD_HASH_BACKEND picks the algorithm for new hashes ('pbkdf2' or 'argon2').
+    PASSWORD_HASH_WORKERS sizes the pool; 0 hashes inline on the calling thread.
+    """
+
+    def __init__(self, app=None):
+        self.backend = 'pbkdf2'
+        self.workers = 0
+        self.pending = 0
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = app.config.setdefault('PASSWORD_HASH_BACKEND', 'pbkdf2')
+        self.workers = app.config.setdefault('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+        if self.backend not in BACKENDS:
+            raise ValueError(f'Unknown PASSWORD_HASH_BACKEND: {self.backend}')
+        if self.backend == 'argon2' and argon2 is None:
+            raise RuntimeError('PASSWORD_HASH_BACKEND=argon2 requires argon2-cffi to be installed')
+        app.extensions['password_hasher'] = self
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        with self._lock:
+            # The pool is created lazily per process so pre-forking servers don't share it
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            self.pending += 1
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def hash(self, password):
+        return self._run(_hash, self.backend, password)
+
+    def verify(self, stored_hash, password):
+        """Check a password and return (matches, new_hash).
+
+        new_hash is set when the stored hash was made with a different backend or
+        outdated parameters, so the caller can persist the upgraded hash.
+        """
+        matches, needs_rehash = self._run(_verify, self.backend, stored_hash, password)
+        if matches and needs_rehash:
+            return True, self.hash(password)
+        return matches, None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,135 @@
+import heapq
+import json
+import logging
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('app.sql')
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(limit):
+    """Override SQL_QUERY_BUDGET for one view."""
+
+    def decorator(view):
+        # functools.wraps copies __dict__, so the attribute survives outer decorators
+        view.query_budget = limit
+        return view
+
+    return decorator
+
+
+class RequestQueryStats:
+    def __init__(self, keep):
+        self.count = 0
+        self.seconds = 0.0
+        self.keep = keep
+        self.slowest = []
+        self._seq = 0
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        if self.keep:
+            self._seq += 1
+            item = (seconds, self._seq, statement)
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, item)
+            else:
+                heapq.heappushpop(self.slowest, item)
+
+    def top(self):
+        return [{'ms': round(seconds * 1000, 2), 'sql': statement}
+                for seconds, _, statement in sorted(self.slowest, reverse=True)]
+
+
+class QueryInstrumentation:
+    """Counts and times the SQL each request issues via SQLAlchemy engine events.
+
+    Every response gets a Server-Timing header with the statement count and total
+    database time. Statements slower than SQL_SLOW_QUERY_MS are logged, as is a
+    per-request summary when SQL_LOG_REQUESTS is set. Requests issuing more than
+    SQL_QUERY_BUDGET statements (or a view's @query_budget) are logged, or raise
+    QueryBudgetExceeded when SQL_QUERY_BUDGET_RAISE is set, which fails tests.
+    Statements run while a streamed body is being generated are not included.
+    """
+
+    def __init__(self, app=None):
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQL_SLOW_QUERY_MS', 100)
+        app.config.setdefault('SQL_SLOWEST_KEPT', 3)
+        app.config.setdefault('SQL_QUERY_BUDGET', 0)
+        app.config.setdefault('SQL_QUERY_BUDGET_RAISE', False)
+        app.config.setdefault('SQL_LOG_REQUESTS', False)
+        if not self._listening:
+            # Engines are created lazily per app, so listen on the Engine class itself
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(Engine, 'handle_error', self._handle_error)
+            self._listening = True
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.extensions['query_instrumentation'] = self
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        elapsed = time.perf_counter() - started
+        if not has_request_context():
+            return
+        stats = g.get('sql_stats')
+        if stats is None:
+            return
+        stats.record(statement, elapsed)
+        if elapsed * 1000 >= current_app.config['SQL_SLOW_QUERY_MS']:
+            logger.warning(json.dumps({
+                'event': 'slow_query', 'endpoint': request.endpoint, 'ms': round(elapsed * 1000, 2),
+                'sql': statement, 'executemany': executemany,
+            }))
+
+    def _handle_error(self, context):
+        # A failed statement never reaches after_cursor_execute, so drop its start time here
+        if context.connection is not None and context.connection.info.get('query_started'):
+            context.connection.info['query_started'].pop()
+
+    def _start_request(self):
+        g.sql_stats = RequestQueryStats(current_app.config['SQL_SLOWEST_KEPT'])
+        g.request_started = time.perf_counter()
+
+    def _finish_request(self, response):
+        # Popped so the error response built after a budget failure isn't checked again
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+        db_ms = stats.seconds * 1000
+        app_ms = (time.perf_counter() - g.request_started) * 1000
+        response.headers.add('Server-Timing', f'db;dur={db_ms:.2f};desc="{stats.count} queries"')
+        response.headers.add('Server-Timing', f'app;dur={app_ms:.2f}')
+
+        summary = {
+            'event': 'request_queries', 'method': request.method, 'path': request.path,
+            'endpoint': request.endpoint, 'status': response.status_code, 'queries': stats.count,
+            'db_ms': round(db_ms, 2), 'app_ms': round(app_ms, 2), 'slowest': stats.top(),
+        }
+        if current_app.config['SQL_LOG_REQUESTS']:
+            logger.info(json.dumps(summary))
+
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None) or current_app.config['SQL_QUERY_BUDGET']
+        if budget and stats.count > budget:
+            message = f'{request.endpoint} issued {stats.count} queries, over its budget of {budget}'
+            if current_app.config['SQL_QUERY_BUDGET_RAISE']:
+                raise QueryBudgetExceeded(message)
+            logger.warning(json.dumps(dict(summary, event='query_budget_exceeded', budget=budget)))
+        return response
@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from flask import Response, g, request
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+from app.pooling import uses_queue_pool
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # metrics are skipped when prometheus_client is not installed
+    prometheus_client = None
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+_pool_wait = None
+_pool_timeouts = None
+_pool_connections = None
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports checkout wait, timeouts and occupancy.
+
+    Samples are labelled with the pool's logging name (replica binds are named
+    after their bind key), so the primary and each replica are told apart.
+    """
+
+    @property
+    def _metrics_name(self):
+        return self.logging_name or 'primary'
+
+    def _sample(self):
+        if _pool_connections is not None:
+            name = self._metrics_name
+            _pool_connections.labels(name, 'checked_out').set(self.checkedout())
+            _pool_connections.labels(name, 'idle').set(self.checkedin())
+            _pool_connections.labels(name, 'capacity').set(self.size() + self._max_overflow)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if _pool_timeouts is not None:
+                _pool_timeouts.labels(self._metrics_name).inc()
+            raise
+        finally:
+            if _pool_wait is not None:
+                _pool_wait.labels(self._metrics_name).observe(time.perf_counter() - started)
+            self._sample()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._sample()
+
+
+class Metrics:
+    """Prometheus metrics served from /metrics.
+
+    Request latency is a histogram labelled by blueprint and endpoint, alongside
+    in-flight requests, pool checkout wait, the password hasher's queue depth and
+    catalog cache hits/misses (their ratio is left to PromQL), plus pool occupancy
+    and checkout timeouts for spotting saturation. Values owned by other
+    extensions are copied into the metrics after each request.
+
+    When PROMETHEUS_MULTIPROC_DIR is set, every worker writes its samples there and
+    /metrics aggregates them, so the numbers are correct whichever worker serves
+    the scrape. The directory must be emptied before the server starts, and the
+    server should call prometheus_client.multiprocess.mark_process_dead(pid) when
+    a worker exits.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Must run before db.init_app so the pool class is in place when engines are created."""
+        if prometheus_client is None:
+            app.logger.warning('prometheus_client is not installed; /metrics is disabled')
+            return
+        if not self.enabled:
+            self._create_metrics()
+            self.enabled = True
+        url = app.config.get('SQLALCHEMY_DATABASE_URI')
+        if url and uses_queue_pool(url):
+            app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).setdefault('poolclass', TimedQueuePool)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.export)
+        app.extensions['metrics'] = self
+
+    def _create_metrics(self):
+        global _pool_wait, _pool_timeouts, _pool_connections
+        self.request_latency = prometheus_client.Histogram(
+            'http_request_duration_seconds', 'Request latency by blueprint and endpoint',
+            ['blueprint', 'endpoint', 'method', 'status'], buckets=REQUEST_BUCKETS,
+        )
+        self.in_flight = prometheus_client.Gauge(
+            'http_requests_in_flight', 'Requests currently being handled',
+            ['blueprint', 'endpoint'], multiprocess_mode='livesum',
+        )
+        self.hash_queue = prometheus_client.Gauge(
+            'password_hash_pending', 'Password hashes queued or running in the executor',
+            multiprocess_mode='livesum',
+        )
+        self.cache_hits = prometheus_client.Counter('catalog_cache_hits', 'Catalog response cache hits')
+        self.cache_misses = prometheus_client.Counter('catalog_cache_misses', 'Catalog response cache misses')
+        _pool_wait = prometheus_client.Histogram(
+            'db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection',
+            ['pool'], buckets=POOL_WAIT_BUCKETS,
+        )
+        _pool_timeouts = prometheus_client.Counter(
+            'db_pool_checkout_timeouts', 'Checkouts that gave up after pool_timeout', ['pool'],
+        )
+        _pool_connections = prometheus_client.Gauge(
+            'db_pool_connections', 'Pooled connections by pool and state; checked_out near capacity means saturation',
+            ['pool', 'state'], multiprocess_mode='livesum',
+        )
+        self._synced = {'hits': 0, 'misses': 0}
+
+    def _labels(self):
+        return request.blueprint or '', request.endpoint or 'unmatched'
+
+    def _start_request(self):
+        if request.endpoint == 'metrics':
+            return
+        g.metrics_started = time.perf_counter()
+        self.in_flight.labels(*self._labels()).inc()
+
+    def _finish_request(self, response):
+        started = g.get('metrics_started')
+        if started is not None:
+            blueprint, endpoint = self._labels()
+            self.request_latency.labels(blueprint, endpoint, request.method, response.status_code).observe(
+                time.perf_counter() - started
+            )
+        self.sync()
+        return response
+
+    def _teardown_request(self, exc):
+        if g.pop('metrics_started', None) is not None:
+            self.in_flight.labels(*self._labels()).dec()
+
+    def sync(self):
+        """Copy the counters kept by the hasher and response cache into their metrics."""
+        from app import hasher, response_cache
+
+        self.hash_queue.set(hasher.pending)
+        with self._lock:
+            for name, counter, current in (('hits', self.cache_hits, response_cache.hits),
+                                           ('misses', self.cache_misses, response_cache.misses)):
+                delta = current - self._synced[name]
+                if delta > 0:
+                    counter.inc(delta)
+                self._synced[name] = current
+
+    def export(self):
+        self.sync()
+        if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+            registry = prometheus_client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = prometheus_client.REGISTRY
+        return Response(prometheus_client.generate_latest(registry), mimetype=prometheus_client.CONTENT_TYPE_LATEST)
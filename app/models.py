@@ -1,6 +1,34 @@
 from datetime import datetime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.hybrid import hybrid_method
+from sqlalchemy.sql.expression import FunctionElement
 from app import db
 
+
+class days_between(FunctionElement):
+    """Whole days from the first datetime expression to the second, like timedelta.days."""
+    type = db.Integer()
+    inherit_cache = True
+
+
+@compiles(days_between)
+def _days_between_default(element, compiler, **kw):
+    start, end = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f'CAST(FLOOR(EXTRACT(EPOCH FROM ({end} - {start})) / 86400) AS INTEGER)'
+
+
+@compiles(days_between, 'sqlite')
+def _days_between_sqlite(element, compiler, **kw):
+    start, end = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f'CAST(FLOOR(julianday({end}) - julianday({start})) AS INTEGER)'
+
+
+@compiles(days_between, 'mysql')
+def _days_between_mysql(element, compiler, **kw):
+    start, end = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f'TIMESTAMPDIFF(DAY, {start}, {end})'
+
+
 class Users(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -18,11 +46,29 @@ class Books(db.Model):
     author = db.Column(db.String(120), nullable=False)
     genre = db.Column(db.String(80), nullable=True)
     isbn = db.Column(db.String(13), unique=True, nullable=False)
-    is_available = db.Column(db.Boolean, default=True)
+    is_available = db.Column(db.Boolean, default=True)  # Kept in step with available_count > 0
+    total_copies = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    available_count = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     borrowed_books = db.relationship('BorrowedBook', backref='books', lazy=True,overlaps="borrowed_books,users")
+
+    # Full-text search document, indexed with GIN on Postgres only
+    __table_args__ = (
+        db.Index(
+            'ix_books_search_document',
+            db.func.to_tsvector(
+                db.literal_column("'simple'"),
+                title + db.literal_column("' '") + author + db.literal_column("' '") + db.func.coalesce(genre, db.literal_column("''")),
+            ),
+            postgresql_using='gin',
+        ).ddl_if(dialect='postgresql'),
+    )
     
     def __repr__(self):
         return f'<Book {self.title}>'
+
+
+# Queries must use this exact expression for the GIN index to be picked up
+books_search_document = next(ix for ix in Books.__table__.indexes if ix.name == 'ix_books_search_document').expressions[0]
     
 
 class BorrowedBook(db.Model):
@@ -38,16 +84,89 @@ class BorrowedBook(db.Model):
     book = db.relationship('Books', backref='borrowed_book', lazy=True,overlaps="borrowed_book,users")
     
     
-    def is_overdue(self):
-        if self.return_date is None and datetime.now() > self.due_date:
+    # Open loans are looked up per user and by due date; circulation history is paged by id per user, per book,
+    # across open loans, or by borrow date. Keep in sync with migrations/versions/
+    __table_args__ = (
+        db.Index('ix_borrowed_book_users_id_return_date', 'users_id', 'return_date'),
+        db.Index('ix_borrowed_book_return_date_due_date', 'return_date', 'due_date'),
+        db.Index('ix_borrowed_book_users_id_id', 'users_id', 'id'),
+        db.Index('ix_borrowed_book_books_id_id', 'books_id', 'id'),
+        db.Index('ix_borrowed_book_borrow_date_id', 'borrow_date', 'id'),
+        db.Index(
+            'ix_borrowed_book_open_due_date', 'due_date', 'id',
+            postgresql_where=db.text('return_date IS NULL'),
+            sqlite_where=db.text('return_date IS NULL'),
+        ),
+        db.Index(
+            # return_date leads so planners without statistics see an equality match as well as the id order
+            'ix_borrowed_book_open_id', 'return_date', 'id',
+            postgresql_where=db.text('return_date IS NULL'),
+            sqlite_where=db.text('return_date IS NULL'),
+        ),
+    )
+
+    # Both methods also work on the class, producing SQL so reports can filter and compute fines in the database
+    @hybrid_method
+    def is_overdue(self, now=None):
+        now = now or datetime.now()
+        if self.return_date is None and now > self.due_date:
             return True
         return False
-    
-    def calculate_fine(self, fine_per_day=1):
-        if self.is_overdue():
-            overdue_days = (datetime.now() - self.due_date).days
+
+    @is_overdue.expression
+    def is_overdue(cls, now=None):
+        now = now or datetime.now()
+        return db.and_(cls.return_date.is_(None), cls.due_date < now)
+
+    @hybrid_method
+    def calculate_fine(self, fine_per_day=1, now=None):
+        now = now or datetime.now()
+        if self.is_overdue(now):
+            overdue_days = (now - self.due_date).days
             return overdue_days * fine_per_day
         return 0
 
+    @calculate_fine.expression
+    def calculate_fine(cls, fine_per_day=1, now=None):
+        now = now or datetime.now()
+        return db.case((cls.is_overdue(now), days_between(cls.due_date, now) * fine_per_day), else_=0)
+
+    def __repr__(self):
+        return f'<BorrowedBook Users: {self.user_id} Books: {self.book_id}>'
+
+
+class BookHold(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    books_id = db.Column(db.Integer, db.ForeignKey('books.id'), nullable=False)
+    users_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    status = db.Column(db.String(16), nullable=False, default='waiting')  # waiting, fulfilled or cancelled
+    fulfilled_at = db.Column(db.DateTime, nullable=True)
+
+    # The head of a title's queue is the lowest waiting id, an index seek rather than a scan
+    __table_args__ = (
+        db.Index('ix_book_hold_books_id_status_id', 'books_id', 'status', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<BookHold Users: {self.users_id} Books: {self.books_id} {self.status}>'
+
+
+class FineLedger(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    borrowed_book_id = db.Column(db.Integer, db.ForeignKey('borrowed_book.id'), unique=True, nullable=False)
+    users_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    days_overdue = db.Column(db.Integer, nullable=False)
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<FineLedger Loan: {self.borrowed_book_id} Amount: {self.amount}>'
+
+
+class RevokedToken(db.Model):
+    jti = db.Column(db.String(36), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)
+
     def __repr__(self):
-        return f'<BorrowedBook Users: {self.user_id} Books: {self.book_id}>'
\ No newline at end of file
+        return f'<RevokedToken {self.jti}>'
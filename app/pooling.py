@@ -0,0 +1,41 @@
+import os
+from sqlalchemy.engine import make_url
+
+
+def env_flag(name, default=False):
+    value = os.getenv(name)
+    return default if value is None else value.lower() in ('1', 'true', 'yes')
+
+
+def uses_queue_pool(uri):
+    """In-memory SQLite runs on a StaticPool; every other URL gets a sized QueuePool."""
+    url = make_url(uri)
+    return not (url.drivername.startswith('sqlite') and url.database in (None, '', ':memory:'))
+
+
+def engine_options_from_env(uri):
+    """Build SQLALCHEMY_ENGINE_OPTIONS from the DB_POOL_* variables.
+
+    Each worker process holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections,
+    so size these against the database's max_connections divided by the number
+    of workers. DB_PGBOUNCER=true targets PgBouncer in transaction pooling mode,
+    where a server connection can change between transactions: server-side
+    prepared statements are turned off (psycopg2 never uses them; psycopg 3 is
+    told not to).
+    """
+    if not uri or not uses_queue_pool(uri):
+        return {}
+    options = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': env_flag('DB_POOL_PRE_PING', True),
+    }
+    if env_flag('DB_PGBOUNCER'):
+        driver = make_url(uri).drivername
+        if not driver.startswith('postgresql'):
+            raise ValueError('DB_PGBOUNCER requires a PostgreSQL DATABASE_URI')
+        if driver == 'postgresql+psycopg':
+            options['connect_args'] = {'prepare_threshold': None}
+    return options
@@ -0,0 +1,106 @@
+import math
+import random
+import time
+from functools import wraps
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from app.pooling import uses_queue_pool
+
+STICKY_COOKIE = 'primary_until'
+
+
+def _is_write(clause):
+    return clause is not None and (getattr(clause, 'is_dml', False) or getattr(clause, '_for_update_arg', None) is not None)
+
+
+class RoutingSession(Session):
+    """Sends statements to the replica picked for a @read_replica request, and everything else to the primary.
+
+    Flushes, DML and SELECT ... FOR UPDATE always go to the primary, and a
+    commit that included one marks the request as a write for the sticky window.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            if self._flushing or _is_write(clause):
+                g.db_pending_write = True
+            elif g.get('db_replica'):
+                return self._db.engines[g.db_replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _record_write(session):
+    if has_app_context() and g.pop('db_pending_write', False):
+        g.db_wrote = True
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_write(session):
+    if has_app_context():
+        g.pop('db_pending_write', None)
+
+
+def sticky_to_primary():
+    """True when replicas are configured and this client wrote within the sticky window."""
+    router = current_app.extensions.get('replica_router')
+    return router is not None and bool(router.replicas) and router.is_sticky()
+
+
+def read_replica(view):
+    """Serve a read-only view from a replica unless the client wrote within the sticky window."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        router = current_app.extensions.get('replica_router')
+        if router is not None and router.replicas and not router.is_sticky():
+            # One replica per request so every query in it sees the same snapshot
+            g.db_replica = random.choice(router.replicas)
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """Registers DATABASE_REPLICA_URIS as binds and keeps clients on the primary after their writes.
+
+    After a request commits a write, the response sets a cookie that keeps that
+    client's @read_replica requests on the primary for REPLICA_STICKY_SECONDS, so
+    replication lag never hides the client's own change. It is a routing hint
+    only: a forged cookie just sends more reads to the primary.
+    """
+
+    def __init__(self, app=None):
+        self.replicas = []
+        self.sticky_seconds = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Must run before db.init_app so the replica engines are created with the others."""
+        uris = app.config.setdefault('DATABASE_REPLICA_URIS', [])
+        self.sticky_seconds = app.config.setdefault('REPLICA_STICKY_SECONDS', 5)
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        # Flask-SQLAlchemy applies SQLALCHEMY_ENGINE_OPTIONS to the default engine only,
+        # so the replicas are given the primary's pool settings and pool class here
+        options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        self.replicas = []
+        for i, uri in enumerate(uris):
+            key = f'replica_{i}'
+            binds[key] = {**options, 'url': uri, 'pool_logging_name': key} if uses_queue_pool(uri) else uri
+            self.replicas.append(key)
+        app.after_request(self._mark_sticky)
+        app.extensions['replica_router'] = self
+
+    def is_sticky(self):
+        try:
+            return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def _mark_sticky(self, response):
+        if self.replicas and g.pop('db_wrote', False):
+            response.set_cookie(STICKY_COOKIE, f'{time.time() + self.sticky_seconds:.3f}',
+                                max_age=math.ceil(self.sticky_seconds), httponly=True, samesite='Lax')
+        return response
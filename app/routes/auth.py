@@ -1,10 +1,8 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity,JWTManager,get_jwt,exceptions
-from app import db
+from app import db, hasher, blocklist, jwt as app_jwt
 from app.models import Users
 
-BLACKLIST = set()
 jwt = JWTManager()
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -15,8 +13,8 @@ def register():
         if not data or not data.get('username') or not data.get('password'):
             return jsonify({'message': 'Invalid input'}), 400
 
-    # Hash the password
-        hashed_password = generate_password_hash(data['password'], method='pbkdf2:sha256')
+    # Hash the password in the hashing pool
+        hashed_password = hasher.hash(data['password'])
 
     # Create a new user instance
         new_user = Users(username=data['username'], email=data['email'], password=hashed_password)
@@ -38,7 +36,12 @@ def login():
         return jsonify({'message': 'Invalid input'}), 400
 
     user = Users.query.filter_by(username=data['username']).first()
-    if user and check_password_hash(user.password, data['password']):
+    matches, new_hash = hasher.verify(user.password, data['password']) if user else (False, None)
+    if matches:
+        # Upgrade hashes made with an older backend or parameters
+        if new_hash:
+            user.password = new_hash
+            db.session.commit()
         # Create a JWT token
         access_token = create_access_token(identity={'username': user.username})
         # return jsonify(access_token=access_token), 200
@@ -54,25 +57,22 @@ def protected():
 
 
 # Add a callback function to check if a token is blacklisted
-@jwt.token_in_blocklist_loader
-def check_if_token_is_blacklisted(jwt_payload):
-    jti = jwt_payload['jti']
-    return jti in BLACKLIST
+@app_jwt.token_in_blocklist_loader
+def check_if_token_is_blacklisted(jwt_header, jwt_payload):
+    return blocklist.is_revoked(jwt_payload['jti'])
 
 @bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
     try:
-        # Get the token's unique identifier (jti)
-        jti = get_jwt()['jti']
-        blac= []
-        # Add the token's jti to the blacklist
-        BLACKLIST.add(jti)
-        for i in BLACKLIST:
-            blac.append(i)
-        return jsonify({"msg": "Successfully logged out","e":blac}), 200
+        # Get the token's unique identifier (jti) and expiry
+        token = get_jwt()
+        # Add the token's jti to the blocklist until the token would have expired anyway
+        blocklist.revoke(token['jti'], token.get('exp'))
+        return jsonify({"msg": "Successfully logged out"}), 200
        
     except Exception as e:
+        db.session.rollback()
         return jsonify({"msg": "An error occurred during logout", "error": str(e)}), 500
 
 
@@ -1,18 +1,346 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, current_app, stream_with_context
 from flask_jwt_extended import jwt_required
-from app import db
-from app.models import Books,BorrowedBook
+from app import db, response_cache, availability_events
+from app.cache import cached_response
+from app.events import StreamLimitReached
+from app.instrumentation import query_budget
+from app.replicas import read_replica, sticky_to_primary
+from app.models import Books,BorrowedBook,BookHold,books_search_document,days_between
+from app.schemas import book_schema, loan_schema
+from app.search import catalog_index, suggest_index, book_text
 from datetime import datetime, timedelta
+import base64
+import csv
+import io
+import queue
 
 bp = Blueprint('books', __name__, url_prefix='/books')
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 1000
+BULK_BATCH_SIZE = 1000
+MAX_CIRCULATION_BATCH = 100
+DEFAULT_LOAN_DAYS = 14
+MAX_BULK_ERRORS = 1000
+EVENTS_KEEPALIVE_SECONDS = 15
+
+
+def _encode_cursor(*values):
+    return base64.urlsafe_b64encode('|'.join(str(value) for value in values).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor, *types):
+    # Cursors are opaque to clients; invalid ones surface as ValueError
+    types = types or (int,)
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        parts = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        values = tuple(convert(part) for convert, part in zip(types, parts, strict=True))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    return values[0] if len(values) == 1 else values
+
+
+def _page_args(*types):
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('Invalid limit')
+    if limit < 1:
+        raise ValueError('Invalid limit')
+    after = request.args.get('after')
+    return min(limit, MAX_PAGE_SIZE), (_decode_cursor(after, *types) if after else None)
+
+
+def _copies_arg(value):
+    # JSON gives us ints, but also bools, fractions and strings; only whole, non-negative counts are accepted
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError('copies must be a non-negative integer')
+    try:
+        copies = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('copies must be a non-negative integer')
+    if copies < 0:
+        raise ValueError('copies must be a non-negative integer')
+    return copies
+
+
+def _index_book(book):
+    catalog_index.update(book.id, book_text(book.title, book.author, book.genre))
+    suggest_index.update_book(book.id, book.title, book.author)
+
+
+def _unindex_book(book_id):
+    catalog_index.remove(book_id)
+    suggest_index.remove_book(book_id)
+
+
+def _normalize_isbn(isbn):
+    # Accepts ISBN-10 or ISBN-13 with optional hyphens/spaces; returns None if the checksum fails
+    isbn = str(isbn or '').replace('-', '').replace(' ', '').upper()
+    if len(isbn) == 10 and isbn[:9].isdigit() and (isbn[9].isdigit() or isbn[9] == 'X'):
+        total = sum((10 - i) * int(ch) for i, ch in enumerate(isbn[:9]))
+        total += 10 if isbn[9] == 'X' else int(isbn[9])
+        return isbn if total % 11 == 0 else None
+    if len(isbn) == 13 and isbn.isdigit():
+        total = sum(int(ch) * (3 if i % 2 else 1) for i, ch in enumerate(isbn))
+        return isbn if total % 10 == 0 else None
+    return None
+
+
+def _bulk_records():
+    # Yields (row number, record) from a JSON array, NDJSON or CSV body without buffering streamed formats
+    if request.mimetype == 'application/x-ndjson':
+        for row_no, line in enumerate(request.stream, start=1):
+            if line.strip():
+                try:
+                    yield row_no, current_app.json.loads(line)
+                except ValueError:
+                    yield row_no, ValueError('Malformed JSON line')
+    elif request.mimetype == 'text/csv':
+        reader = csv.DictReader(io.TextIOWrapper(request.stream, encoding='utf-8'))
+        for row_no, record in enumerate(reader, start=1):
+            yield row_no, record
+    else:
+        records = request.get_json(silent=True)
+        if not isinstance(records, list):
+            raise ValueError('Expected a JSON array of books')
+        yield from enumerate(records, start=1)
+
+
+def _validate_bulk_record(record):
+    if isinstance(record, ValueError):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError('Expected an object')
+    row = {}
+    for field, max_len in (('title', 120), ('author', 120), ('genre', 80)):
+        value = record.get(field)
+        if value is None:
+            value = ''
+        elif not isinstance(value, str):
+            raise ValueError(f'{field} must be a string')
+        value = value.strip()
+        if not value and field != 'genre':
+            raise ValueError(f'Missing {field}')
+        if len(value) > max_len:
+            raise ValueError(f'{field} is longer than {max_len} characters')
+        row[field] = value or None
+    row['isbn'] = _normalize_isbn(record.get('isbn'))
+    if row['isbn'] is None:
+        raise ValueError('Invalid ISBN')
+    return row
+
+
+def _insert_books(rows):
+    # Multi-row insert; ON CONFLICT DO NOTHING guards against rows created concurrently by another import
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(Books).on_conflict_do_nothing(index_elements=['isbn'])
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(Books).on_conflict_do_nothing(index_elements=['isbn'])
+    else:
+        stmt = db.insert(Books)
+    db.session.execute(stmt, [dict(row, is_available=True, total_copies=1, available_count=1) for row in rows])
+
+
+def _flush_bulk_batch(batch, upsert, report):
+    existing = dict(db.session.execute(
+        db.select(Books.isbn, Books.id).where(Books.isbn.in_([row['isbn'] for _, row in batch]))
+    ).all())
+    new_rows = [row for _, row in batch if row['isbn'] not in existing]
+    try:
+        if new_rows:
+            _insert_books(new_rows)
+        if upsert and existing:
+            # ORM bulk UPDATE by primary key, issued as a single executemany
+            db.session.execute(db.update(Books), [
+                dict(row, id=existing[row['isbn']]) for _, row in batch if row['isbn'] in existing
+            ])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        for row_no, row in batch:
+            _bulk_error(report, row_no, row['isbn'], str(e))
+        return
+    report['inserted'] += len(new_rows)
+    report['updated' if upsert else 'skipped'] += len(batch) - len(new_rows)
+
+
+def _bulk_error(report, row_no, isbn, error):
+    report['failed'] += 1
+    if len(report['errors']) < MAX_BULK_ERRORS:
+        report['errors'].append({'row': row_no, 'isbn': isbn, 'error': error})
+
+
+def _id_list(data, key):
+    ids = data.get(key)
+    if not isinstance(ids, list) or not ids or len(ids) > MAX_CIRCULATION_BATCH:
+        raise ValueError(f'{key} must be a list of 1 to {MAX_CIRCULATION_BATCH} ids')
+    if not all(isinstance(item, int) and not isinstance(item, bool) for item in ids):
+        raise ValueError(f'{key} must contain integer ids')
+    return list(dict.fromkeys(ids))
+
+
+def _take_copy():
+    # Conditional decrement of the title's counter; is_available is assigned first because MySQL
+    # applies SET clauses left to right, so both assignments see the pre-update count everywhere
+    return (
+        db.update(Books)
+        .where(Books.available_count > 0)
+        .ordered_values(
+            (Books.is_available, Books.available_count > 1),
+            (Books.available_count, Books.available_count - 1),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _return_copies(book_ids):
+    # One executemany incrementing each title once per returned loan
+    counts = {}
+    for book_id in book_ids:
+        counts[book_id] = counts.get(book_id, 0) + 1
+    books = Books.__table__
+    db.session.execute(
+        db.update(books)
+        .where(books.c.id == db.bindparam('book_id'))
+        .values(available_count=books.c.available_count + db.bindparam('returned'), is_available=True),
+        [{'book_id': book_id, 'returned': returned} for book_id, returned in counts.items()],
+    )
+
+
+def _waiting_hold():
+    # Correlates with the books row being updated or selected
+    return db.exists().where(BookHold.books_id == Books.id, BookHold.status == 'waiting')
+
+
+def _assign_to_next_hold(book_id, now):
+    # Claim the head of the title's queue; the conditional update makes concurrent returns pick distinct holds
+    while True:
+        hold = db.session.execute(
+            db.select(BookHold.id, BookHold.users_id)
+            .where(BookHold.books_id == book_id, BookHold.status == 'waiting')
+            .order_by(BookHold.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if hold is None:
+            return None
+        taken = db.session.execute(
+            db.update(BookHold)
+            .where(BookHold.id == hold.id, BookHold.status == 'waiting')
+            .values(status='fulfilled', fulfilled_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if taken.rowcount == 1:
+            break
+    db.session.execute(db.insert(BorrowedBook), [{
+        'users_id': hold.users_id, 'books_id': book_id,
+        'borrow_date': now, 'due_date': now + timedelta(days=DEFAULT_LOAN_DAYS),
+    }])
+    return hold.users_id
+
+
+def _release_copies(book_ids):
+    """Hand each returned copy to the next patron waiting on its title, or put it back on the shelf.
+
+    Returns {book_id: [user ids the copies were handed to]}.
+    """
+    now = datetime.now()
+    # Lock the titles first so a concurrent place_hold either sees the copy on the shelf or has its hold seen here
+    db.session.execute(db.select(Books.id).where(Books.id.in_(set(book_ids))).order_by(Books.id).with_for_update())
+    held = set(db.session.scalars(
+        db.select(BookHold.books_id).distinct()
+        .where(BookHold.books_id.in_(set(book_ids)), BookHold.status == 'waiting')
+    ))
+    handed_off, shelved = {}, []
+    for book_id in book_ids:
+        user_id = _assign_to_next_hold(book_id, now) if book_id in held else None
+        if user_id is None:
+            held.discard(book_id)
+            shelved.append(book_id)
+        else:
+            handed_off.setdefault(book_id, []).append(user_id)
+    if shelved:
+        _return_copies(shelved)
+    return handed_off
+
+
+def _serve_waiting_holds(book_id):
+    """Hand copies on the shelf to the patrons waiting on the title, in queue order.
+
+    Returns the user ids the copies were handed to.
+    """
+    now = datetime.now()
+    served = []
+    while db.session.execute(_take_copy().where(Books.id == book_id, _waiting_hold())).rowcount == 1:
+        user_id = _assign_to_next_hold(book_id, now)
+        if user_id is None:
+            # The last hold was taken or cancelled concurrently; the copy goes back on the shelf
+            _return_copies([book_id])
+            break
+        served.append(user_id)
+    return served
+
+
+def _claim_books(book_ids):
+    # Set-based conditional update; only titles that still had a copy on the shelf and nobody waiting are claimed
+    stmt = _take_copy().where(Books.id.in_(book_ids), ~_waiting_hold())
+    if db.engine.dialect.update_returning:
+        return set(db.session.scalars(stmt.returning(Books.id)))
+    claimable = set(db.session.scalars(
+        db.select(Books.id).where(Books.id.in_(book_ids), Books.available_count > 0, ~_waiting_hold()).with_for_update()
+    ))
+    if claimable:
+        db.session.execute(stmt.where(Books.id.in_(claimable)))
+    return claimable
+
+
+def _wants_ndjson():
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+
+def _skip_cache():
+    # A client inside its read-your-writes window must not get a page another client built from a lagging replica
+    return _wants_ndjson() or sticky_to_primary()
+
+
+def _stream_rows(query, schema, fields):
+    # Rows are fetched in batches from a server-side cursor and written out as they arrive
+    encode = schema.encoder(fields)
+    for row in db.session.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE)):
+        yield current_app.json.dumps(encode(row)) + '\n'
+
+
 @bp.route('/', methods=['GET'])
 @jwt_required()
+@read_replica
+@cached_response(response_cache, unless=_skip_cache)
 def get_books():
     try:
-        books = Books.query.all()
-        books_list = [{'id': book.id, 'title': book.title, 'author': book.author, 'genre':book.genre,'isbn': book.isbn, 'is_available': book.is_available} for book in books]
-        return jsonify(books_list), 200
+        fields = book_schema.fields(request.args.get('fields'))
+        query = book_schema.select(fields, Books.id).order_by(Books.id)
+        if _wants_ndjson():
+            return Response(stream_with_context(_stream_rows(query, book_schema, fields)), mimetype='application/x-ndjson')
+
+        if 'limit' in request.args or 'after' in request.args:
+            # Keyset pagination: each page is a bounded range scan on the primary key
+            limit, after = _page_args()
+            if after is not None:
+                query = query.where(Books.id > after)
+            books = db.session.execute(query.limit(limit + 1)).all()
+            # The trailing Books.id column keeps the cursor available whichever fields were asked for
+            next_cursor = _encode_cursor(books[limit - 1][-1]) if len(books) > limit else None
+            return jsonify({'books': book_schema.serialize(books[:limit], fields), 'next_cursor': next_cursor}), 200
+
+        books = db.session.execute(query)
+        return jsonify(book_schema.serialize(books, fields)), 200
+    except ValueError as e:
+        return jsonify({"msg": "Missing or invalid data", "error": str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "An error occurred while getting books", "error": str(e)}), 500
@@ -20,14 +348,114 @@ def get_books():
         return jsonify({"msg": "Missing or invalid data"}), 400
     
     
+@bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_books():
+    try:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({"msg": "Missing or invalid data", "error": "q is required"}), 400
+        limit, offset = _page_args()
+        offset = offset or 0
+
+        if db.engine.dialect.name == 'postgresql':
+            # Matches are served by the GIN index on books_search_document
+            tsquery = db.func.plainto_tsquery(db.literal_column("'simple'"), q)
+            rank = db.func.ts_rank(books_search_document, tsquery)
+            rows = db.session.execute(
+                book_schema.select(None, rank.label('score'))
+                .where(books_search_document.op('@@')(tsquery))
+                .order_by(rank.desc(), Books.id)
+                .limit(limit + 1)
+                .offset(offset)
+            )
+            results = [row._asdict() for row in rows]
+        else:
+            catalog_index.ensure_loaded(db, Books, max_age=current_app.config['SEARCH_INDEX_TTL'])
+            hits = catalog_index.search(q, limit + 1, offset)
+            rows = db.session.execute(book_schema.select().where(Books.id.in_([doc_id for doc_id, _ in hits])))
+            books = {row.id: row._asdict() for row in rows}
+            results = [dict(books[doc_id], score=score) for doc_id, score in hits if doc_id in books]
+
+        next_cursor = _encode_cursor(offset + limit) if len(results) > limit else None
+        return jsonify({'books': results[:limit], 'next_cursor': next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"msg": "Missing or invalid data", "error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "An error occurred while searching books", "error": str(e)}), 500
+
+
+@bp.route('/suggest', methods=['GET'])
+@jwt_required()
+def suggest_books():
+    try:
+        prefix = request.args.get('prefix', '')
+        if not prefix.strip():
+            return jsonify({"msg": "Missing or invalid data", "error": "prefix is required"}), 400
+        suggest_index.ensure_loaded(db, Books, BorrowedBook, max_age=current_app.config['SEARCH_INDEX_TTL'])
+        return jsonify(suggest_index.suggest(prefix)), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "An error occurred while suggesting books", "error": str(e)}), 500
+
+
+def _arg_set(name, type=str):
+    values = {value.strip() for raw in request.args.getlist(name) for value in raw.split(',') if value.strip()}
+    return {type(value) for value in values} or None
+
+
+def _stream_events(subscription, dumps):
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event = subscription.events.get(timeout=EVENTS_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                event = None
+            if subscription.lost:
+                # Events were dropped for this client, so it must refetch availability
+                yield 'event: resync\ndata: {}\n\n'
+                return
+            if event is None:
+                yield ': keepalive\n\n'
+                continue
+            yield f'event: availability\ndata: {dumps(event)}\n\n'
+    finally:
+        availability_events.unsubscribe(subscription)
+
+
+@bp.route('/events', methods=['GET'])
+@jwt_required()
+def availability_stream():
+    try:
+        book_ids = _arg_set('book_id', int)
+        genres = _arg_set('genre')
+    except ValueError as e:
+        return jsonify({"msg": "Missing or invalid data", "error": str(e)}), 400
+    # Give the connection back to the pool; the stream itself never touches the database
+    db.session.close()
+    try:
+        subscription = availability_events.subscribe(book_ids, genres)
+    except StreamLimitReached as e:
+        return jsonify({"msg": "Too many open availability streams", "error": str(e)}), 503, {'Retry-After': '5'}
+    return Response(_stream_events(subscription, current_app.json.dumps), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@read_replica
+@cached_response(response_cache, unless=sticky_to_primary)
 def get_book(id):
     try:
-        book = Books.query.get(id)
+        fields = book_schema.fields(request.args.get('fields'))
+        book = db.session.execute(book_schema.select(fields).where(Books.id == id)).first()
         if not book:
             return jsonify({'message': 'Book not found'}), 404
-        return jsonify({'id': book.id, 'title': book.title, 'genre':book.genre,'author': book.author, 'isbn': book.isbn, 'is_available': book.is_available}), 200
+        return jsonify(book_schema.encoder(fields)(book)), 200
+    except ValueError as e:
+        return jsonify({"msg": "Missing or invalid data", "error": str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "An error occurred while getting book", "error": str(e)}), 500
@@ -41,16 +469,24 @@ def get_book(id):
 def add_book():
     try:
         data = request.get_json()
+        copies = _copies_arg(data.get('copies', 1))
         new_book = Books(
         title=data['title'],
         author=data['author'],
         genre=data['genre'],
         isbn=data['isbn'],
-        is_available=True
+        total_copies=copies,
+        available_count=copies,
+        is_available=copies > 0
     )
         db.session.add(new_book)
         db.session.commit()
+        _index_book(new_book)
+        response_cache.bump()
         return jsonify({'message': 'Book added successfully!'}), 201
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"msg": "Missing or invalid data", "error": str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "An error occurred while adding book", "error": str(e)}), 500
@@ -59,6 +495,46 @@ def add_book():
     
     
 
+@bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def bulk_add_books():
+    try:
+        on_conflict = request.args.get('on_conflict', 'skip')
+        if on_conflict not in ('skip', 'update'):
+            return jsonify({"msg": "Missing or invalid data", "error": "on_conflict must be skip or update"}), 400
+
+        report = {'inserted': 0, 'updated': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+        batch = {}
+        for row_no, record in _bulk_records():
+            try:
+                row = _validate_bulk_record(record)
+            except ValueError as e:
+                _bulk_error(report, row_no, record.get('isbn') if isinstance(record, dict) else None, str(e))
+                continue
+            if row['isbn'] in batch:
+                # A later row for the same ISBN wins, as it would with sequential upserts
+                report['skipped'] += 1
+            batch[row['isbn']] = (row_no, row)
+            if len(batch) >= BULK_BATCH_SIZE:
+                _flush_bulk_batch(list(batch.values()), on_conflict == 'update', report)
+                batch = {}
+        if batch:
+            _flush_bulk_batch(list(batch.values()), on_conflict == 'update', report)
+
+        report['errors_truncated'] = report['failed'] > len(report['errors'])
+        if report['inserted'] or report['updated']:
+            catalog_index.invalidate()
+            suggest_index.invalidate()
+            response_cache.bump()
+        return jsonify(report), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"msg": "Missing or invalid data", "error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "An error occurred while importing books", "error": str(e)}), 500
+
+
 @bp.route('/<int:id>', methods=['PUT'])
 @jwt_required()
 def update_book(id):
@@ -71,8 +547,36 @@ def update_book(id):
         book.author = data.get('author', book.author)
         book.genre = data.get('genre', book.genre)
         book.isbn = data.get('isbn', book.isbn)
+        handed_off = []
+        if 'copies' in data:
+            # Resize both counters in one statement, refusing to drop below the copies currently on loan
+            copies = _copies_arg(data['copies'])
+            delta = copies - Books.total_copies
+            resized = db.session.execute(
+                db.update(Books)
+                .where(Books.id == id, Books.available_count + delta >= 0)
+                .ordered_values(
+                    (Books.is_available, Books.available_count + delta > 0),
+                    (Books.available_count, Books.available_count + delta),
+                    (Books.total_copies, copies),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if resized.rowcount != 1:
+                db.session.rollback()
+                return jsonify({"msg": "Missing or invalid data", "error": "copies cannot be fewer than the copies on loan"}), 400
+            handed_off = _serve_waiting_holds(id)  # Added copies go to the hold queue before walk-ins
         db.session.commit()
+        _index_book(book)
+        for _ in handed_off:
+            suggest_index.record_borrow(id)
+        response_cache.bump()
+        if 'copies' in data or 'genre' in data:
+            availability_events.publish_books([id], 'updated')
         return jsonify({'message': 'Book updated successfully!'}), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"msg": "Missing or invalid data", "error": str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "An error occurred while updating book", "error": str(e)}), 500
@@ -88,8 +592,12 @@ def delete_book(id):
         book = Books.query.get(id)
         if not book:
             return jsonify({'message': 'Book not found'}), 404
+        genre = book.genre
         db.session.delete(book)
         db.session.commit()
+        _unindex_book(id)
+        response_cache.bump()
+        availability_events.publish([{'book_id': id, 'genre': genre, 'available_count': 0, 'is_available': False, 'reason': 'deleted'}])
         return jsonify({'message': 'Book deleted successfully!'}), 200
     except KeyError:
         return jsonify({"msg": "Missing or invalid data"}), 400
@@ -104,26 +612,27 @@ def borrow_book():
         data = request.get_json()
         user_id = data.get('user_id')
         book_id = data.get('book_id')
-        days_to_borrow = data.get('days', 14)  # Default borrowing period is 14 days
+        days_to_borrow = data.get('days', DEFAULT_LOAN_DAYS)  # Default borrowing period is 14 days
 
-    # Check if book is available
-        book = Books.query.get(book_id)
-        if not book or not book.is_available:
+    # Take a copy with a single conditional update so concurrent borrowers cannot overdraw the title or jump the hold queue
+        claimed = db.session.execute(_take_copy().where(Books.id == book_id, ~_waiting_hold()))
+        if claimed.rowcount != 1:
+            db.session.rollback()
             return jsonify({'error': 'Book is not available or does not exist.'}), 404
 
     # Calculate due date
         borrow_date = datetime.now()
         due_date = borrow_date + timedelta(days=days_to_borrow)
 
-    # Create BorrowedBook entry
+    # Create BorrowedBook entry in the same transaction as the claim
         borrowed_book = BorrowedBook(users_id=user_id, books_id=book_id, borrow_date=borrow_date, due_date=due_date)
         db.session.add(borrowed_book)
-
-    # Update book availability
-        book.is_available = False
         db.session.commit()
+        suggest_index.record_borrow(book_id)
+        response_cache.bump()
+        availability_events.publish_books([book_id], 'borrowed')
 
-        return jsonify({'message': 'Book borrowed successfully!', 'due_date': due_date.strftime('%Y-%m-%d')}), 200
+        return jsonify({'message': 'Book borrowed successfully!', 'due_date': due_date}), 200
 
     except KeyError:
         return jsonify({"msg": "Missing or invalid data"}), 400
@@ -144,29 +653,211 @@ def return_book():
         if not borrowed_book:
             return jsonify({'error': 'Borrowed book record not found.'}), 404
 
-    # Update return date
-        borrowed_book.return_date = datetime.now()
-        borrowed_book.book.is_available = True  # Mark the book as available again
+    # Close the loan only once, so a repeated return cannot put an extra copy back on the shelf
+        closed = db.session.execute(
+            db.update(BorrowedBook)
+            .where(BorrowedBook.id == borrowed_book.id, BorrowedBook.return_date.is_(None))
+            .values(return_date=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        if closed.rowcount != 1:
+            db.session.rollback()
+            return jsonify({'error': 'Book was already returned.'}), 400
+        handed_off = _release_copies([borrowed_book.books_id])  # Next patron in line, else back on the shelf
         db.session.commit()
+        for book_id in handed_off:
+            suggest_index.record_borrow(book_id)
+        response_cache.bump()
+        availability_events.publish_books([borrowed_book.books_id], 'returned')
 
-        return jsonify({'message': 'Book returned successfully!'}), 200
+        handed_to = handed_off.get(borrowed_book.books_id, [None])[0]
+        return jsonify({'message': 'Book returned successfully!', 'handed_off_to': handed_to}), 200
     except KeyError:
         return jsonify({"msg": "Missing or invalid data"}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "An error occurred while trying to return a book", "error": str(e)}), 500
 
+@bp.route('/borrow/batch', methods=['POST'])
+@jwt_required()
+def borrow_books_batch():
+    try:
+        data = request.get_json()
+        user_id = data['user_id']
+        book_ids = _id_list(data, 'book_ids')
+        days_to_borrow = data.get('days', DEFAULT_LOAN_DAYS)  # Default borrowing period is 14 days
+
+        borrow_date = datetime.now()
+        due_date = borrow_date + timedelta(days=days_to_borrow)
+
+    # Claim every available book and record the loans in one transaction
+        claimed = _claim_books(book_ids)
+        loan_ids = {}
+        if claimed:
+            loans = [
+                {'users_id': user_id, 'books_id': book_id, 'borrow_date': borrow_date, 'due_date': due_date}
+                for book_id in book_ids if book_id in claimed
+            ]
+            if db.engine.dialect.insert_executemany_returning:
+                rows = db.session.execute(db.insert(BorrowedBook).returning(BorrowedBook.id, BorrowedBook.books_id), loans)
+                loan_ids = {row.books_id: row.id for row in rows}
+            else:
+                db.session.execute(db.insert(BorrowedBook), loans)
+        db.session.commit()
+
+        for book_id in claimed:
+            suggest_index.record_borrow(book_id)
+        if claimed:
+            response_cache.bump()
+            availability_events.publish_books(claimed, 'borrowed')
+
+        results = [
+            {'book_id': book_id, 'status': 'borrowed', 'borrowed_book_id': loan_ids.get(book_id), 'due_date': due_date}
+            if book_id in claimed else
+            {'book_id': book_id, 'status': 'unavailable', 'error': 'Book is not available or does not exist.'}
+            for book_id in book_ids
+        ]
+        return jsonify({'borrowed': len(claimed), 'failed': len(book_ids) - len(claimed), 'results': results}), 200
+    except (KeyError, TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({"msg": "Missing or invalid data", "error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "An error occurred while making an attempt to borrow books", "error": str(e)}), 500
+
+
+@bp.route('/return/batch', methods=['POST'])
+@jwt_required()
+def return_books_batch():
+    try:
+        data = request.get_json()
+        loan_ids = _id_list(data, 'borrowed_book_ids')
+
+    # Lock the loan rows, then close the open ones and free their books with two set-based updates
+        loans = db.session.execute(
+            db.select(BorrowedBook.id, BorrowedBook.books_id, BorrowedBook.return_date)
+            .where(BorrowedBook.id.in_(loan_ids))
+            .with_for_update()
+        ).all()
+        found = {loan.id: loan for loan in loans}
+        open_loans = [loan for loan in loans if loan.return_date is None]
+        if open_loans:
+            db.session.execute(
+                db.update(BorrowedBook)
+                .where(BorrowedBook.id.in_([loan.id for loan in open_loans]), BorrowedBook.return_date.is_(None))
+                .values(return_date=datetime.now())
+                .execution_options(synchronize_session=False)
+            )
+            handed_off = _release_copies([loan.books_id for loan in open_loans])
+        db.session.commit()
+        if open_loans:
+            for book_id in handed_off:
+                suggest_index.record_borrow(book_id)
+            response_cache.bump()
+            availability_events.publish_books([loan.books_id for loan in open_loans], 'returned')
+
+        results = []
+        for loan_id in loan_ids:
+            loan = found.get(loan_id)
+            if loan is None:
+                results.append({'borrowed_book_id': loan_id, 'status': 'not_found', 'error': 'Borrowed book record not found.'})
+            elif loan.return_date is not None:
+                results.append({'borrowed_book_id': loan_id, 'status': 'already_returned', 'error': 'Book was already returned.'})
+            else:
+                handed_to = handed_off.get(loan.books_id)
+                results.append({'borrowed_book_id': loan_id, 'book_id': loan.books_id, 'status': 'returned',
+                                'handed_off_to': handed_to.pop(0) if handed_to else None})
+        return jsonify({'returned': len(open_loans), 'failed': len(loan_ids) - len(open_loans), 'results': results}), 200
+    except (KeyError, TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({"msg": "Missing or invalid data", "error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "An error occurred while trying to return books", "error": str(e)}), 500
+
+@bp.route('/<int:id>/hold', methods=['POST'])
+@jwt_required()
+def place_hold(id):
+    try:
+        data = request.get_json()
+        user_id = data['user_id']
+
+        # Locked against _release_copies, which would otherwise shelve a copy between this read and the insert
+        book = db.session.execute(
+            db.select(Books.id, Books.available_count).where(Books.id == id).with_for_update()
+        ).first()
+        if not book:
+            return jsonify({'message': 'Book not found'}), 404
+        if book.available_count > 0:
+            return jsonify({'error': 'Book is available; borrow it instead.'}), 409
+        already_waiting = db.session.scalar(
+            db.select(BookHold.id).where(BookHold.books_id == id, BookHold.users_id == user_id, BookHold.status == 'waiting')
+        )
+        if already_waiting:
+            return jsonify({'error': 'User already has a hold on this book.', 'hold_id': already_waiting}), 409
+
+        hold = BookHold(books_id=id, users_id=user_id, created_at=datetime.now(), status='waiting')
+        db.session.add(hold)
+        db.session.flush()
+        # Where the row lock is a no-op, a copy shelved since the read above still goes down the queue
+        handed_off = _serve_waiting_holds(id)
+        db.session.commit()
+        if handed_off:
+            for _ in handed_off:
+                suggest_index.record_borrow(id)
+            response_cache.bump()
+            availability_events.publish_books([id], 'borrowed')
+        position = None if user_id in handed_off else db.session.scalar(
+            db.select(db.func.count()).select_from(BookHold)
+            .where(BookHold.books_id == id, BookHold.status == 'waiting', BookHold.id <= hold.id)
+        )
+        return jsonify({
+            'message': 'Hold placed successfully!', 'hold_id': hold.id, 'position': position, 'handed_off_to': handed_off,
+        }), 201
+    except KeyError:
+        return jsonify({"msg": "Missing or invalid data"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "An error occurred while placing a hold", "error": str(e)}), 500
+
+
+@bp.route('/holds/<int:hold_id>', methods=['DELETE'])
+@jwt_required()
+def cancel_hold(hold_id):
+    try:
+        cancelled = db.session.execute(
+            db.update(BookHold)
+            .where(BookHold.id == hold_id, BookHold.status == 'waiting')
+            .values(status='cancelled')
+            .execution_options(synchronize_session=False)
+        )
+        if cancelled.rowcount != 1:
+            db.session.rollback()
+            return jsonify({'error': 'Hold not found or no longer waiting.'}), 404
+        db.session.commit()
+        return jsonify({'message': 'Hold cancelled successfully!'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "An error occurred while cancelling a hold", "error": str(e)}), 500
+
+
 @bp.route('/borrowed/<int:users_id>', methods=['GET'])
 @jwt_required()
+@query_budget(2)
 def list_borrowed_books(users_id):
     try:
-        borrowed_books = BorrowedBook.query.filter_by(users_id=users_id, return_date=None).all()  # Only unreturned books
+        # One joined query projecting only the needed columns, however many loans the user has
+        borrowed_books = db.session.execute(
+            db.select(BorrowedBook.books_id, Books.title, BorrowedBook.borrow_date, BorrowedBook.due_date)
+            .join(Books, Books.id == BorrowedBook.books_id)
+            .where(BorrowedBook.users_id == users_id, BorrowedBook.return_date.is_(None))  # Only unreturned books
+        ).all()
         borrowed_books_list = [
         {
-            'book_id': borrowed.book_id,
-            'title': borrowed.book.title,
-            'borrow_date': borrowed.borrow_date.strftime('%Y-%m-%d'),
-            'due_date': borrowed.due_date.strftime('%Y-%m-%d'),
+            'book_id': borrowed.books_id,
+            'title': borrowed.title,
+            'borrow_date': borrowed.borrow_date,
+            'due_date': borrowed.due_date,
         }
         for borrowed in borrowed_books
         ]
@@ -177,13 +868,111 @@ def list_borrowed_books(users_id):
         db.session.rollback()
         return jsonify({"msg": "An error occurred while displaying borrowed books", "error": str(e)}), 500
     
+@bp.route('/overdue', methods=['GET'])
+@jwt_required()
+def list_overdue_books():
+    try:
+        limit, after = _page_args(datetime.fromisoformat, int)
+        fine_per_day = request.args.get('fine_per_day', 1, type=float)
+        now = datetime.now()
+
+        # Overdue filter and fines are evaluated in SQL; rows come back in (due_date, id) order from the index
+        query = (
+            db.select(
+                BorrowedBook.id, BorrowedBook.users_id, BorrowedBook.books_id, Books.title,
+                BorrowedBook.borrow_date, BorrowedBook.due_date,
+                days_between(BorrowedBook.due_date, now).label('days_overdue'),
+                BorrowedBook.calculate_fine(fine_per_day, now).label('fine'),
+            )
+            .join(Books, Books.id == BorrowedBook.books_id)
+            .where(BorrowedBook.is_overdue(now))
+            .order_by(BorrowedBook.due_date, BorrowedBook.id)
+            .limit(limit + 1)
+        )
+        if after is not None:
+            after_due, after_id = after
+            query = query.where(db.or_(
+                BorrowedBook.due_date > after_due,
+                db.and_(BorrowedBook.due_date == after_due, BorrowedBook.id > after_id),
+            ))
+        rows = db.session.execute(query).all()
+
+        overdue_list = [
+        {
+            'id': row.id,
+            'users_id': row.users_id,
+            'book_id': row.books_id,
+            'title': row.title,
+            'borrow_date': row.borrow_date,
+            'due_date': row.due_date,
+            'days_overdue': row.days_overdue,
+            'fine': row.fine,
+        }
+        for row in rows[:limit]
+        ]
+        next_cursor = _encode_cursor(rows[limit - 1].due_date.isoformat(), rows[limit - 1].id) if len(rows) > limit else None
+        return jsonify({'loans': overdue_list, 'next_cursor': next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"msg": "Missing or invalid data", "error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "An error occurred while getting overdue books", "error": str(e)}), 500
+
+
+def _borrowed_filters():
+    # Filters map onto the (users_id, id), (books_id, id), (borrow_date, id) and open-loan (id) indexes on borrowed_book
+    filters = []
+    if 'user' in request.args:
+        filters.append(BorrowedBook.users_id == int(request.args['user']))
+    if 'book' in request.args:
+        filters.append(BorrowedBook.books_id == int(request.args['book']))
+    if request.args.get('open_only', 'false').lower() in ('1', 'true', 'yes'):
+        filters.append(BorrowedBook.return_date.is_(None))
+    if 'borrowed_after' in request.args:
+        filters.append(BorrowedBook.borrow_date >= datetime.fromisoformat(request.args['borrowed_after']))
+    if 'borrowed_before' in request.args:
+        filters.append(BorrowedBook.borrow_date < datetime.fromisoformat(request.args['borrowed_before']))
+    return filters
+
+
 @bp.route('/borrowed', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_borrowedBooks():
     try:
-        borrowed_books = BorrowedBook.query.all()
-        borrowedList = [{ 'id': borrowed.id, 'users_id': borrowed.users_id,'books_id':borrowed.books_id, 'borrowed_Date': borrowed.borrow_date, 'due_Date':borrowed.due_date,'return_Date': borrowed.return_date, } for borrowed in borrowed_books]
-        return jsonify(borrowedList), 200
+        fields = loan_schema.fields(request.args.get('fields'))
+        # Date-range queries without a user or book are read in (borrow_date, id) order off that index
+        by_date = (('borrowed_after' in request.args or 'borrowed_before' in request.args)
+                   and 'user' not in request.args and 'book' not in request.args)
+        keys = (BorrowedBook.borrow_date, BorrowedBook.id) if by_date else (BorrowedBook.id,)
+        query = loan_schema.select(fields, *keys).where(*_borrowed_filters()).order_by(*keys)
+        if _wants_ndjson():
+            return Response(stream_with_context(_stream_rows(query, loan_schema, fields)), mimetype='application/x-ndjson')
+
+        if 'limit' in request.args or 'after' in request.args:
+            if by_date:
+                limit, after = _page_args(datetime.fromisoformat, int)
+                if after is not None:
+                    after_date, after_id = after
+                    query = query.where(db.or_(
+                        BorrowedBook.borrow_date > after_date,
+                        db.and_(BorrowedBook.borrow_date == after_date, BorrowedBook.id > after_id),
+                    ))
+            else:
+                limit, after = _page_args()
+                if after is not None:
+                    query = query.where(BorrowedBook.id > after)
+            rows = db.session.execute(query.limit(limit + 1)).all()
+            next_cursor = None
+            if len(rows) > limit:
+                last = rows[limit - 1]
+                next_cursor = _encode_cursor(last[-2].isoformat(), last[-1]) if by_date else _encode_cursor(last[-1])
+            return jsonify({'loans': loan_schema.serialize(rows[:limit], fields), 'next_cursor': next_cursor}), 200
+
+        borrowed_books = db.session.execute(query)
+        return jsonify(loan_schema.serialize(borrowed_books, fields)), 200
+    except ValueError as e:
+        return jsonify({"msg": "Missing or invalid data", "error": str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "An error occurred while getting borrowed books", "error": str(e)}), 500
@@ -2,17 +2,24 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import Users
+from app.replicas import read_replica
+from app.schemas import user_schema
 
 bp = Blueprint('users', __name__, url_prefix='/users')
 
 @bp.route('/profile', methods=['GET'])
 @jwt_required()
+@read_replica
 def get_user_profile():
     current_user = get_jwt_identity()
-    user = Users.query.filter_by(username=current_user['username']).first()
+    try:
+        fields = user_schema.fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"msg": "Missing or invalid data", "error": str(e)}), 400
+    user = db.session.execute(user_schema.select(fields).where(Users.username == current_user['username'])).first()
     if not user:
         return jsonify({'message': 'User not found'}), 404
-    return jsonify({'username': user.username, 'email': user.email, 'is_active': user.is_active}), 200
+    return jsonify(user_schema.encoder(fields)(user)), 200
 
 @bp.route('/profile', methods=['PUT'])
 @jwt_required()
@@ -0,0 +1,53 @@
+from functools import lru_cache
+from app import db
+from app.models import Books, Users, BorrowedBook
+
+
+class Projection:
+    """Read-only serializer for a model that selects just the requested columns.
+
+    Queries return plain Row tuples in field order, so no ORM objects enter the
+    identity map, and each row is turned into a dict by zipping it with the
+    precompiled key tuple for the selected fields.
+    """
+
+    def __init__(self, **columns):
+        self.columns = {key: column.label(key) for key, column in columns.items()}
+        self.all_fields = tuple(self.columns)
+
+    def fields(self, raw=None):
+        """Parse a comma-separated ?fields= value; None or empty selects every field."""
+        if not raw:
+            return self.all_fields
+        fields = tuple(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+        unknown = [field for field in fields if field not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return fields or self.all_fields
+
+    def select(self, fields=None, *extra):
+        """SELECT the given fields, followed by `extra` columns that serialize() leaves out."""
+        fields = fields or self.all_fields
+        return db.select(*(self.columns[field] for field in fields), *extra)
+
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def encoder(fields):
+        return lambda row: dict(zip(fields, row))
+
+    def serialize(self, rows, fields=None):
+        encode = self.encoder(fields or self.all_fields)
+        return [encode(row) for row in rows]
+
+
+book_schema = Projection(
+    id=Books.id, title=Books.title, author=Books.author, genre=Books.genre, isbn=Books.isbn,
+    is_available=Books.is_available, available_count=Books.available_count, total_copies=Books.total_copies,
+)
+
+user_schema = Projection(username=Users.username, email=Users.email, is_active=Users.is_active)
+
+loan_schema = Projection(
+    id=BorrowedBook.id, users_id=BorrowedBook.users_id, books_id=BorrowedBook.books_id,
+    borrowed_Date=BorrowedBook.borrow_date, due_Date=BorrowedBook.due_date, return_Date=BorrowedBook.return_date,
+)
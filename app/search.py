@@ -0,0 +1,313 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def book_text(title, author, genre):
+    return ' '.join(part for part in (title, author, genre) if part)
+
+
+class RefreshedIndex:
+    """Base for in-process indexes built from the database and refreshed after `max_age` seconds.
+
+    Each process keeps its index current with its own writes, and the periodic
+    rebuild picks up books added, changed or deleted by other worker processes.
+    The first load blocks; a refresh runs in one request while the others keep
+    using the current index, and writes made during the rebuild are replayed
+    onto it before it is swapped in. Subclasses list the attributes holding
+    their data in `_fields` and build them in `_load()`.
+    """
+
+    _fields = ()
+
+    def __init__(self):
+        self.loaded = False
+        self._loaded_at = 0
+        self._generation = 0
+        self._pending = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _fresh(self, max_age):
+        return self.loaded and (max_age is None or time.monotonic() - self._loaded_at < max_age)
+
+    def ensure_loaded(self, db, *models, max_age=None):
+        if self._fresh(max_age):
+            return
+        if not self._load_lock.acquire(blocking=not self.loaded):
+            return  # Another request is refreshing; serve from the current index meanwhile
+        try:
+            if self._fresh(max_age):
+                return
+            with self._lock:
+                self._pending = []
+                generation = self._generation
+            fresh = self._spawn()
+            fresh._load(db, *models)
+            with self._lock:
+                for op, args in self._pending:
+                    getattr(fresh, op)(*args)
+                self._pending = None
+                if generation == self._generation:  # Not invalidated while loading
+                    for name in self._fields:
+                        setattr(self, name, getattr(fresh, name))
+                    self.loaded = True
+                    self._loaded_at = time.monotonic()
+        finally:
+            self._load_lock.release()
+
+    def _apply(self, op, *args):
+        # Runs a write against the index and records it for a rebuild in progress. Replaying a
+        # write the rebuild already read is harmless, except that a borrow may be counted twice
+        # until the next refresh
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((op, args))
+            if self.loaded:
+                getattr(self, op)(*args)
+
+    def invalidate(self):
+        """Drop the index so it is rebuilt from the database on next use."""
+        empty = self._spawn()
+        with self._lock:
+            self._generation += 1
+            self.loaded = False
+            for name in self._fields:
+                setattr(self, name, getattr(empty, name))
+
+
+class BM25Index(RefreshedIndex):
+    """In-process inverted index over the book catalog, ranked with Okapi BM25.
+
+    Used when the database has no native full-text search. The index is built
+    from the Books table on first use, kept current by the book write routes of
+    this process and rebuilt every SEARCH_INDEX_TTL seconds.
+    """
+
+    _fields = ('_postings', '_doc_terms', '_doc_len', '_total_len')
+
+    def __init__(self, k1=1.2, b=0.75):
+        super().__init__()
+        self.k1 = k1
+        self.b = b
+        self._postings = {}
+        self._doc_terms = {}
+        self._doc_len = {}
+        self._total_len = 0
+
+    def _spawn(self):
+        return BM25Index(self.k1, self.b)
+
+    def _load(self, db, model):
+        rows = db.session.execute(
+            db.select(model.id, model.title, model.author, model.genre)
+            .execution_options(yield_per=10000)
+        )
+        for row in rows:
+            self._add(row.id, book_text(row.title, row.author, row.genre))
+
+    def _add(self, doc_id, text):
+        terms = {}
+        for term in tokenize(text):
+            terms[term] = terms.get(term, 0) + 1
+        self._doc_terms[doc_id] = terms
+        self._doc_len[doc_id] = sum(terms.values())
+        self._total_len += self._doc_len[doc_id]
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def _remove(self, doc_id):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_len -= self._doc_len.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def _replace(self, doc_id, text):
+        self._remove(doc_id)
+        self._add(doc_id, text)
+
+    def update(self, doc_id, text):
+        self._apply('_replace', doc_id, text)
+
+    def remove(self, doc_id):
+        self._apply('_remove', doc_id)
+
+    def search(self, query, limit, offset=0):
+        """Return up to `limit` (doc_id, score) pairs after `offset`, best first."""
+        with self._lock:
+            return self._search(query, limit, offset)
+
+    def _search(self, query, limit, offset):
+        n_docs = len(self._doc_terms)
+        if not n_docs:
+            return []
+        avg_len = self._total_len / n_docs
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in list(postings.items()):
+                norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len.get(doc_id, 0) / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        ranked = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return ranked[offset:]
+
+
+class PrefixIndex:
+    """Top-k completion over a set of weighted strings.
+
+    Prefixes up to `depth` characters are nodes that cache their k best
+    completions (recomputed lazily from their children after a change); each
+    string lives in a sorted bucket under its first `depth` characters, which
+    longer prefixes bisect directly.
+    """
+
+    def __init__(self, k=10, depth=4):
+        self.k = k
+        self.depth = depth
+        self._terms = {}
+        self._children = {}
+        self._buckets = {}
+        self._top = {}
+
+    def _rank(self, norms):
+        return heapq.nsmallest(self.k, norms, key=lambda norm: (-self._terms[norm][1], norm))
+
+    def _link(self, norm):
+        for i in range(1, min(len(norm), self.depth) + 1):
+            self._children.setdefault(norm[:i - 1], set()).add(norm[i - 1])
+        bisect.insort(self._buckets.setdefault(norm[:self.depth], []), norm)
+
+    def _unlink(self, norm):
+        key = norm[:self.depth]
+        bucket = self._buckets[key]
+        del bucket[bisect.bisect_left(bucket, norm)]
+        if bucket:
+            return
+        del self._buckets[key]
+        # Prune prefix nodes that no longer lead anywhere
+        for i in range(len(key), 0, -1):
+            prefix = key[:i]
+            if prefix in self._buckets or self._children.get(prefix):
+                break
+            self._children.pop(prefix, None)
+            self._children[prefix[:-1]].discard(prefix[-1])
+
+    def adjust(self, text, score=0, refs=0):
+        """Change the weight and reference count of `text`; it is dropped when refs reaches 0."""
+        norm = text.strip().lower() if text else ''
+        if not norm:
+            return
+        entry = self._terms.get(norm)
+        if entry is None:
+            entry = self._terms[norm] = [text.strip(), 0, 0]
+            self._link(norm)
+        entry[1] += score
+        entry[2] += refs
+        if entry[2] <= 0:
+            del self._terms[norm]
+            self._unlink(norm)
+        for i in range(1, min(len(norm), self.depth) + 1):
+            self._top.pop(norm[:i], None)
+
+    def _node_top(self, prefix):
+        top = self._top.get(prefix)
+        if top is None:
+            candidates = list(self._buckets.get(prefix, ()))
+            if len(prefix) < self.depth:
+                for char in self._children.get(prefix, ()):
+                    candidates.extend(self._node_top(prefix + char))
+            top = self._top[prefix] = self._rank(candidates)
+        return top
+
+    def suggest(self, prefix):
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        if len(prefix) <= self.depth:
+            norms = self._node_top(prefix) if prefix in self._children or prefix in self._buckets else []
+        else:
+            bucket = self._buckets.get(prefix[:self.depth], [])
+            start = bisect.bisect_left(bucket, prefix)
+            end = bisect.bisect_left(bucket, prefix + '\uffff', start)
+            norms = self._rank(bucket[start:end])
+        return [{'text': self._terms[norm][0], 'popularity': self._terms[norm][1]} for norm in norms]
+
+
+class BookSuggester(RefreshedIndex):
+    """Title and author completions ranked by how often the books were borrowed."""
+
+    _fields = ('titles', 'authors', '_books')
+
+    def __init__(self, k=10):
+        super().__init__()
+        self.titles = PrefixIndex(k)
+        self.authors = PrefixIndex(k)
+        self._books = {}
+
+    def _spawn(self):
+        return BookSuggester(self.titles.k)
+
+    def _load(self, db, book_model, loan_model):
+        rows = db.session.execute(
+            db.select(book_model.id, book_model.title, book_model.author, db.func.count(loan_model.id))
+            .outerjoin(loan_model, loan_model.books_id == book_model.id)
+            .group_by(book_model.id, book_model.title, book_model.author)
+            .execution_options(yield_per=10000)
+        )
+        for book_id, title, author, popularity in rows:
+            self._add(book_id, title, author, popularity)
+
+    def _add(self, book_id, title, author, popularity=0):
+        self._books[book_id] = (title, author, popularity)
+        self.titles.adjust(title, popularity, 1)
+        self.authors.adjust(author, popularity, 1)
+
+    def _remove(self, book_id):
+        title, author, popularity = self._books.pop(book_id, (None, None, 0))
+        self.titles.adjust(title, -popularity, -1)
+        self.authors.adjust(author, -popularity, -1)
+        return popularity
+
+    def _replace(self, book_id, title, author):
+        self._add(book_id, title, author, self._remove(book_id))
+
+    def _borrowed(self, book_id):
+        if book_id in self._books:
+            title, author, popularity = self._books[book_id]
+            self._books[book_id] = (title, author, popularity + 1)
+            self.titles.adjust(title, 1)
+            self.authors.adjust(author, 1)
+
+    def update_book(self, book_id, title, author):
+        self._apply('_replace', book_id, title, author)
+
+    def remove_book(self, book_id):
+        self._apply('_remove', book_id)
+
+    def record_borrow(self, book_id):
+        self._apply('_borrowed', book_id)
+
+    def suggest(self, prefix):
+        with self._lock:
+            return {'titles': self.titles.suggest(prefix), 'authors': self.authors.suggest(prefix)}
+
+
+catalog_index = BM25Index()
+suggest_index = BookSuggester()
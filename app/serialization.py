@@ -0,0 +1,73 @@
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is used without it
+    orjson = None
+
+
+def _default(o):
+    """Encode the non-JSON types the API returns; dates and times become ISO 8601 strings."""
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class StdlibJSONProvider(JSONProvider):
+    """The stdlib encoder with insertion-ordered keys and ISO 8601 dates."""
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', False)
+        kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return json.loads(s, **kwargs)
+
+
+class OrjsonProvider(JSONProvider):
+    """orjson-backed provider; responses are built from its bytes without a str round trip.
+
+    orjson writes datetimes natively in the same ISO 8601 form as isoformat().
+    """
+
+    option = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=_default, option=self.option),
+                                        mimetype='application/json')
+
+
+PROVIDERS = {'orjson': OrjsonProvider, 'stdlib': StdlibJSONProvider}
+
+
+def json_provider_class(name=None):
+    """Pick the provider named by JSON_PROVIDER, defaulting to orjson when it is installed."""
+    name = name or ('orjson' if orjson is not None else 'stdlib')
+    if name not in PROVIDERS:
+        raise ValueError(f'Unknown JSON_PROVIDER: {name}')
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_PROVIDER=orjson requires orjson to be installed')
+    return PROVIDERS[name]
@@ -0,0 +1,102 @@
+"""Shared setup for the benchmark scripts.
+
+Each script builds the app against a throwaway SQLite file and drives it
+in-process through Flask test clients, one per thread. Run them from the
+repository root, e.g. ``python -m benchmarks.search``. The numbers are for
+comparing configurations on one machine, not for capacity planning: a real
+deployment adds the WSGI server, the network and a server database.
+"""
+import os
+import random
+import tempfile
+import threading
+import time
+
+os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-with-enough-bytes')
+os.environ.setdefault('CATALOG_CACHE_SIZE', '0')  # Measure the routes, not the response cache
+
+WORDS = (
+    'river night garden empire shadow glass winter harbor letters silent storm north island memory '
+    'kingdom fire ocean city summer stone forest moon paper house secret road light iron dream wolf'
+).split()
+GENRES = ('fiction', 'history', 'science', 'poetry', 'mystery', 'biography')
+
+
+def make_app(**env):
+    """create_app on a fresh database file, with env layered over the process environment."""
+    directory = tempfile.mkdtemp(prefix='library-bench-')
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'library.db')}"
+    os.environ.update({name: str(value) for name, value in env.items()})
+    from app import create_app
+    from app.search import catalog_index, suggest_index
+
+    catalog_index.invalidate()
+    suggest_index.invalidate()
+    return create_app()
+
+
+def seed_books(app, count, seed=0):
+    """Insert count books with titles drawn from WORDS, in one executemany."""
+    from app import db
+    from app.models import Books
+
+    rng = random.Random(seed)
+    rows = [{
+        'title': ' '.join(rng.sample(WORDS, 3)).title(),
+        'author': f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}',
+        'genre': rng.choice(GENRES),
+        'isbn': str(9780000000000 + i),
+        'is_available': True, 'total_copies': 1, 'available_count': 1,
+    } for i in range(count)]
+    with app.app_context():
+        db.session.execute(db.insert(Books), rows)
+        db.session.commit()
+
+
+def login_headers(client, username='bench', password='bench-password'):
+    client.post('/auth/register', json={'username': username, 'password': password, 'email': f'{username}@example.com'})
+    response = client.post('/auth/login', json={'username': username, 'password': password})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+
+def hammer(app, threads, seconds, request):
+    """Call request(client) from each thread until the time is up.
+
+    Returns (latencies in seconds, error responses, elapsed seconds).
+    """
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        client = app.test_client()
+        mine, failed = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = request(client)
+            mine.append(time.perf_counter() - started)
+            failed += response.status_code >= 400
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies, sum(errors), time.perf_counter() - started
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] if ordered else float('nan')
+
+
+def report(name, latencies, errors, elapsed):
+    print(f'{name:<32} {len(latencies) / elapsed:>9.1f} req/s  '
+          f'p50 {percentile(latencies, 50) * 1000:7.2f} ms  '
+          f'p95 {percentile(latencies, 95) * 1000:7.2f} ms  '
+          f'p99 {percentile(latencies, 99) * 1000:7.2f} ms  '
+          f'errors {errors}')
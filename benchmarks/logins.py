@@ -0,0 +1,35 @@
+"""Login throughput with password hashing inline and in the process pool.
+
+Every login verifies a PBKDF2 (or argon2) hash, which dominates the route.
+PASSWORD_HASH_WORKERS=0 verifies on the request thread; a pool moves the work
+to other processes so concurrent logins are not serialized behind the GIL.
+
+    python -m benchmarks.logins --threads 8 --seconds 10 --workers 0 4 8
+"""
+import argparse
+import os
+
+from benchmarks._common import hammer, login_headers, make_app, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, os.cpu_count() or 1])
+    parser.add_argument('--backend', default=os.getenv('PASSWORD_HASH_BACKEND', 'pbkdf2'))
+    args = parser.parse_args()
+
+    credentials = {'username': 'bench', 'password': 'bench-password'}
+    for workers in args.workers:
+        app = make_app(PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_BACKEND=args.backend)
+        login_headers(app.test_client(), **credentials)
+        latencies, errors, elapsed = hammer(
+            app, args.threads, args.seconds, lambda client: client.post('/auth/login', json=credentials),
+        )
+        report(f'{args.backend} workers={workers}', latencies, errors, elapsed)
+        app.extensions['password_hasher'].shutdown()
+
+
+if __name__ == '__main__':
+    main()
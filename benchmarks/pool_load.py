@@ -0,0 +1,44 @@
+"""Throughput and pool checkout wait with more threads than pooled connections.
+
+Runs GET /books/?limit=50 from --threads threads against a pool sized by the
+DB_POOL_* options, then reads the checkout wait and timeout counts from the
+Prometheus metrics the pool records (prometheus_client must be installed).
+
+    python -m benchmarks.pool_load --threads 32 --pool-size 5 --max-overflow 10
+"""
+import argparse
+
+import prometheus_client
+
+from benchmarks._common import hammer, login_headers, make_app, report, seed_books
+
+
+def sample(name, pool='primary'):
+    return prometheus_client.REGISTRY.get_sample_value(name, {'pool': pool}) or 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--pool-size', type=int, default=5)
+    parser.add_argument('--max-overflow', type=int, default=10)
+    parser.add_argument('--pool-timeout', type=float, default=30)
+    args = parser.parse_args()
+
+    app = make_app(DB_POOL_SIZE=args.pool_size, DB_MAX_OVERFLOW=args.max_overflow, DB_POOL_TIMEOUT=args.pool_timeout)
+    seed_books(app, 1000)
+    headers = login_headers(app.test_client())
+
+    before = {name: sample(name) for name in (
+        'db_pool_checkout_wait_seconds_sum', 'db_pool_checkout_wait_seconds_count', 'db_pool_checkout_timeouts_total')}
+    report(f'{args.threads} threads, pool {args.pool_size}+{args.max_overflow}',
+           *hammer(app, args.threads, args.seconds, lambda client: client.get('/books/?limit=50', headers=headers)))
+    waited = sample('db_pool_checkout_wait_seconds_sum') - before['db_pool_checkout_wait_seconds_sum']
+    checkouts = sample('db_pool_checkout_wait_seconds_count') - before['db_pool_checkout_wait_seconds_count']
+    timeouts = sample('db_pool_checkout_timeouts_total') - before['db_pool_checkout_timeouts_total']
+    print(f'{int(checkouts)} checkouts, mean wait {waited / max(checkouts, 1) * 1000:.2f} ms, {int(timeouts)} timeouts')
+
+
+if __name__ == '__main__':
+    main()
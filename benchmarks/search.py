@@ -0,0 +1,42 @@
+"""Latency percentiles for /books/search and /books/suggest.
+
+On SQLite both routes are served by the in-process indexes in app.search, so
+this measures BM25 ranking and prefix lookups over the seeded catalog; the
+index build happens before timing starts. Point DATABASE_URI elsewhere to
+compare, but note make_app always uses a fresh SQLite file.
+
+    python -m benchmarks.search --books 20000 --threads 4 --seconds 10
+"""
+import argparse
+import random
+
+from benchmarks._common import WORDS, hammer, login_headers, make_app, report, seed_books
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    app = make_app()
+    seed_books(app, args.books)
+    headers = login_headers(app.test_client())
+    rng = random.Random(1)
+
+    def search(client):
+        query = ' '.join(rng.sample(WORDS, rng.randint(1, 3)))
+        return client.get('/books/search', query_string={'q': query, 'limit': 20}, headers=headers)
+
+    def suggest(client):
+        word = rng.choice(WORDS)
+        return client.get('/books/suggest', query_string={'prefix': word[:rng.randint(1, len(word))]}, headers=headers)
+
+    for name, request in (('GET /books/search', search), ('GET /books/suggest', suggest)):
+        request(app.test_client())  # Builds the index outside the timed run
+        report(name, *hammer(app, args.threads, args.seconds, request))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""JSON encoding cost with the orjson and stdlib providers.
+
+Times the provider alone on a list of loan-shaped dicts (with datetimes), then
+GET /books/ end to end for the same catalog under each JSON_PROVIDER.
+
+    python -m benchmarks.serialization --rows 5000 --repeat 50
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from app.serialization import orjson
+from benchmarks._common import hammer, login_headers, make_app, report, seed_books
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    payload = [{
+        'id': i, 'users_id': i % 97, 'books_id': i % 1013, 'title': f'Book {i}',
+        'borrow_date': now - timedelta(days=i % 30), 'due_date': now + timedelta(days=14 - i % 30), 'return_date': None,
+    } for i in range(args.rows)]
+
+    for provider in ('orjson', 'stdlib') if orjson is not None else ('stdlib',):
+        app = make_app(JSON_PROVIDER=provider)
+        with app.app_context():
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                app.json.response(payload)
+            encode = (time.perf_counter() - started) / args.repeat
+        print(f'{provider:<7} encode {args.rows} rows {encode * 1000:8.2f} ms')
+
+        seed_books(app, args.rows)
+        headers = login_headers(app.test_client())
+        report(f'{provider} GET /books/', *hammer(app, 1, args.seconds, lambda client: client.get('/books/', headers=headers)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Add open-loan and borrow-date indexes for /books/borrowed history pages
+
+Revision ID: 2c7d9e4a6b18
+Revises: 9a1f6c3e7d52
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c7d9e4a6b18'
+down_revision = '9a1f6c3e7d52'
+branch_labels = None
+depends_on = None
+
+OPEN_LOANS = sa.text('return_date IS NULL')
+
+INDEXES = [
+    ('ix_borrowed_book_borrow_date_id', ['borrow_date', 'id'], {}),
+    # Partial index covering only open loans, on dialects that support it
+    ('ix_borrowed_book_open_id', ['return_date', 'id'], {'postgresql_where': OPEN_LOANS, 'sqlite_where': OPEN_LOANS}),
+]
+
+
+def upgrade():
+    # db.create_all may already have built these on a fresh database
+    if op.get_context().dialect.name == 'postgresql':
+        # Build concurrently so a live circulation table keeps accepting writes
+        with op.get_context().autocommit_block():
+            for name, columns, kw in INDEXES:
+                op.create_index(name, 'borrowed_book', columns, if_not_exists=True, postgresql_concurrently=True, **kw)
+    else:
+        for name, columns, kw in INDEXES:
+            op.create_index(name, 'borrowed_book', columns, if_not_exists=True, **kw)
+
+
+def downgrade():
+    for name, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='borrowed_book', if_exists=True)
@@ -0,0 +1,44 @@
+"""Add composite and partial indexes on borrowed_book
+
+Revision ID: 3f2a9c1d7b45
+Revises: 
+Create Date: 2026-10-18 17:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b45'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+OPEN_LOANS = sa.text('return_date IS NULL')
+
+INDEXES = [
+    ('ix_borrowed_book_users_id_return_date', ['users_id', 'return_date'], {}),
+    ('ix_borrowed_book_return_date_due_date', ['return_date', 'due_date'], {}),
+    ('ix_borrowed_book_users_id_id', ['users_id', 'id'], {}),
+    ('ix_borrowed_book_books_id_id', ['books_id', 'id'], {}),
+    # Partial index covering only open loans, on dialects that support it
+    ('ix_borrowed_book_open_due_date', ['due_date', 'id'], {'postgresql_where': OPEN_LOANS, 'sqlite_where': OPEN_LOANS}),
+]
+
+
+def upgrade():
+    # borrowed_book predates migrations (db.create_all), which may already have built some of these
+    if op.get_context().dialect.name == 'postgresql':
+        # Build concurrently so a live circulation table keeps accepting writes
+        with op.get_context().autocommit_block():
+            for name, columns, kw in INDEXES:
+                op.create_index(name, 'borrowed_book', columns, if_not_exists=True, postgresql_concurrently=True, **kw)
+    else:
+        for name, columns, kw in INDEXES:
+            op.create_index(name, 'borrowed_book', columns, if_not_exists=True, **kw)
+
+
+def downgrade():
+    for name, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='borrowed_book', if_exists=True)
@@ -0,0 +1,35 @@
+"""Add revoked_token table for the shared JWT blocklist
+
+Revision ID: 5e8b2d4f1c90
+Revises: d4a91c7e2f60
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8b2d4f1c90'
+down_revision = 'd4a91c7e2f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases built by db.create_all after this change already have the table
+    if sa.inspect(op.get_bind()).has_table('revoked_token'):
+        op.create_index('ix_revoked_token_expires_at', 'revoked_token', ['expires_at'], if_not_exists=True)
+        return
+    op.create_table(
+        'revoked_token',
+        sa.Column('jti', sa.String(length=36), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('jti'),
+    )
+    op.create_index('ix_revoked_token_expires_at', 'revoked_token', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_revoked_token_expires_at', table_name='revoked_token')
+    op.drop_table('revoked_token')
@@ -0,0 +1,36 @@
+"""Add per-title copy counters to books
+
+Revision ID: 8c4e2b7a9d13
+Revises: 3f2a9c1d7b45
+Create Date: 2026-10-18 17:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e2b7a9d13'
+down_revision = '3f2a9c1d7b45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases built by db.create_all after this change already have the columns
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('books')}
+    with op.batch_alter_table('books') as batch_op:
+        if 'total_copies' not in columns:
+            batch_op.add_column(sa.Column('total_copies', sa.Integer(), nullable=False, server_default='1'))
+        if 'available_count' not in columns:
+            batch_op.add_column(sa.Column('available_count', sa.Integer(), nullable=False, server_default='1'))
+
+    # Every existing row is a single copy; a borrowed one has none left on the shelf
+    books = sa.table('books', sa.column('is_available', sa.Boolean), sa.column('available_count', sa.Integer))
+    op.execute(books.update().where(books.c.is_available == sa.false()).values(available_count=0))
+
+
+def downgrade():
+    with op.batch_alter_table('books') as batch_op:
+        batch_op.drop_column('available_count')
+        batch_op.drop_column('total_copies')
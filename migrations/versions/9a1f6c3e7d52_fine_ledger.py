@@ -0,0 +1,42 @@
+"""Add fine_ledger table written by flask accrue-fines
+
+Revision ID: 9a1f6c3e7d52
+Revises: 5e8b2d4f1c90
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a1f6c3e7d52'
+down_revision = '5e8b2d4f1c90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases built by db.create_all after this change already have the table
+    if sa.inspect(op.get_bind()).has_table('fine_ledger'):
+        op.create_index('ix_fine_ledger_users_id', 'fine_ledger', ['users_id'], if_not_exists=True)
+        return
+    op.create_table(
+        'fine_ledger',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('borrowed_book_id', sa.Integer(), nullable=False),
+        sa.Column('users_id', sa.Integer(), nullable=False),
+        sa.Column('days_overdue', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['borrowed_book_id'], ['borrowed_book.id']),
+        sa.ForeignKeyConstraint(['users_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('borrowed_book_id'),
+    )
+    op.create_index('ix_fine_ledger_users_id', 'fine_ledger', ['users_id'])
+
+
+def downgrade():
+    op.drop_index('ix_fine_ledger_users_id', table_name='fine_ledger')
+    op.drop_table('fine_ledger')
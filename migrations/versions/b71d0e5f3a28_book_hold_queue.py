@@ -0,0 +1,41 @@
+"""Add book_hold reservation queue
+
+Revision ID: b71d0e5f3a28
+Revises: 8c4e2b7a9d13
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71d0e5f3a28'
+down_revision = '8c4e2b7a9d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases built by db.create_all after this change already have the table
+    if sa.inspect(op.get_bind()).has_table('book_hold'):
+        op.create_index('ix_book_hold_books_id_status_id', 'book_hold', ['books_id', 'status', 'id'], if_not_exists=True)
+        return
+    op.create_table(
+        'book_hold',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('books_id', sa.Integer(), nullable=False),
+        sa.Column('users_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('fulfilled_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['books_id'], ['books.id']),
+        sa.ForeignKeyConstraint(['users_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_book_hold_books_id_status_id', 'book_hold', ['books_id', 'status', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_book_hold_books_id_status_id', table_name='book_hold')
+    op.drop_table('book_hold')
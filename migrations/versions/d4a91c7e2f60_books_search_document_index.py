@@ -0,0 +1,34 @@
+"""Add GIN full-text index on books for /books/search
+
+Revision ID: d4a91c7e2f60
+Revises: b71d0e5f3a28
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a91c7e2f60'
+down_revision = 'b71d0e5f3a28'
+branch_labels = None
+depends_on = None
+
+# Must match books_search_document in app/models.py exactly, or the planner won't use the index
+SEARCH_DOCUMENT = "to_tsvector('simple', title || ' ' || author || ' ' || coalesce(genre, ''))"
+
+
+def upgrade():
+    # Full-text search is served by SQL only on PostgreSQL; other dialects use the in-process index
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    # db.create_all only builds this on a fresh books table, so existing catalogs need it added here
+    with op.get_context().autocommit_block():
+        op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_books_search_document ON books USING gin ({SEARCH_DOCUMENT})')
+
+
+def downgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_books_search_document')
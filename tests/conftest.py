@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+os.environ.setdefault('JWT_SECRET_KEY', 'test-secret-key-with-enough-bytes')
+os.environ['PASSWORD_HASH_WORKERS'] = '0'
+os.environ['CATALOG_CACHE_SIZE'] = '0'  # The response cache is process-wide and would outlive each test's database
+os.environ.pop('FAST_BOOT', None)
+
+from app import create_app, db
+from app.models import Books, Users
+from app.search import catalog_index, suggest_index
+
+
+@pytest.fixture
+def app_env():
+    """Extra environment for create_app; override in a test module to change the configuration."""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, app_env):
+    # A file database so that threads each get their own connection
+    monkeypatch.setenv('DATABASE_URI', f"sqlite:///{tmp_path / 'library.db'}")
+    for name, value in app_env.items():
+        monkeypatch.setenv(name, value)
+    app = create_app()
+    app.config['TESTING'] = True
+    catalog_index.invalidate()
+    suggest_index.invalidate()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(client):
+    client.post('/auth/register', json={'username': 'librarian', 'password': 'pw', 'email': 'librarian@example.com'})
+    response = client.post('/auth/login', json={'username': 'librarian', 'password': 'pw'})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+
+@pytest.fixture
+def add_books(app):
+    def add_books(count, **fields):
+        with app.app_context():
+            books = [Books(title=f'Book {i}', author='Author', genre='fiction', isbn=str(9780000000000 + i),
+                           is_available=True, **fields) for i in range(count)]
+            db.session.add_all(books)
+            db.session.commit()
+            return [book.id for book in books]
+
+    return add_books
+
+
+@pytest.fixture
+def add_user(app):
+    def add_user(username):
+        with app.app_context():
+            user = Users(username=username, email=f'{username}@example.com', password='x')
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+
+    return add_user
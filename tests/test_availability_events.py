@@ -0,0 +1,131 @@
+import pytest
+from flask import Flask
+
+from app import availability_events, events
+from app.events import AvailabilityBroker
+
+
+class _Stop(Exception):
+    pass
+
+
+class _UnreachableEngine:
+    def raw_connection(self):
+        raise OSError('connection refused')
+
+
+def test_listener_failure_resyncs_subscribers_and_backs_off(monkeypatch):
+    broker = AvailabilityBroker()
+    subscription = broker.subscribe()
+    broker._engine = _UnreachableEngine()
+    delays = []
+
+    def sleep(seconds):
+        delays.append(seconds)
+        if len(delays) == 7:
+            raise _Stop
+
+    monkeypatch.setattr(events.time, 'sleep', sleep)
+    with pytest.raises(_Stop):
+        broker._listen()
+
+    assert delays == [1, 2, 4, 8, 16, 30, 30]
+    assert subscription.lost
+    assert subscription.events.get_nowait() is None
+
+
+def test_stream_resyncs_as_soon_as_it_is_marked_lost(app, client, auth_headers):
+    response = client.get('/books/events', headers=auth_headers)
+    try:
+        assert next(response.response) == b'retry: 5000\n\n'
+        availability_events._resync_all()
+        assert next(response.response) == b'event: resync\ndata: {}\n\n'
+    finally:
+        response.close()
+
+
+def test_streams_over_the_cap_are_refused(app, client, auth_headers, monkeypatch):
+    monkeypatch.setattr(availability_events, 'max_streams', 1)
+    first = client.get('/books/events', headers=auth_headers)
+    try:
+        assert first.status_code == 200
+        second = client.get('/books/events', headers=auth_headers)
+        assert second.status_code == 503
+        assert second.headers['Retry-After'] == '5'
+    finally:
+        first.close()
+
+    # Closing a stream frees its slot
+    third = client.get('/books/events', headers=auth_headers)
+    third.close()
+    assert third.status_code == 200
+
+
+class _Notify:
+    def __init__(self, payload):
+        self.payload = payload
+
+
+class _Psycopg3Connection:
+    # Mimics psycopg 3 behind a pooled connection: notifications come from a blocking generator, not poll() and a list
+    def __init__(self, payloads):
+        self.payloads = payloads
+        self.driver_connection = self
+        self.autocommit = False
+
+    def cursor(self):
+        return self
+
+    def execute(self, statement):
+        pass
+
+    def notifies(self):
+        for payload in self.payloads:
+            yield _Notify(payload)
+        raise OSError('server closed the connection')
+
+    def invalidate(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Psycopg3Engine:
+    class dialect:
+        driver = 'psycopg'
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def raw_connection(self):
+        return self.connection
+
+
+def test_listener_reads_psycopg3_notifications():
+    broker = AvailabilityBroker()
+    subscription = broker.subscribe(book_ids={2})
+    broker._engine = _Psycopg3Engine(_Psycopg3Connection(['{"book_id": 1}', '{"book_id": 2, "available_count": 0}']))
+
+    with pytest.raises(OSError):
+        broker._listen_once()
+
+    assert subscription.events.get_nowait() == {'book_id': 2, 'available_count': 0}
+    assert subscription.events.empty()
+
+
+@pytest.mark.parametrize('uri', ['postgresql+asyncpg://db/library', 'postgresql+pg8000://db/library'])
+def test_postgres_backend_refuses_drivers_it_cannot_listen_through(uri):
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=uri, AVAILABILITY_EVENTS_BACKEND='postgres')
+
+    with pytest.raises(ValueError):
+        AvailabilityBroker(app)
+
+
+@pytest.mark.parametrize('uri', ['postgresql://db/library', 'postgresql+psycopg2://db/library', 'postgresql+psycopg://db/library'])
+def test_postgres_backend_accepts_psycopg_drivers(uri):
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=uri, AVAILABILITY_EVENTS_BACKEND='postgres')
+
+    assert AvailabilityBroker(app).backend == 'postgres'
@@ -0,0 +1,100 @@
+import pytest
+
+from app import db
+from app.models import BorrowedBook, Books
+
+
+def _borrow_batch(client, headers, user_id, book_ids):
+    return client.post('/books/borrow/batch', json={'user_id': user_id, 'book_ids': book_ids}, headers=headers)
+
+
+def _return_batch(client, headers, loan_ids):
+    return client.post('/books/return/batch', json={'borrowed_book_ids': loan_ids}, headers=headers)
+
+
+def _hold(client, headers, user_id, book_id):
+    assert client.post(f'/books/{book_id}/hold', json={'user_id': user_id}, headers=headers).status_code == 201
+
+
+def test_batch_borrow_reports_each_book(app, client, auth_headers, add_books, add_user):
+    free, taken = add_books(2)
+    user_id = add_user('reader')
+    _borrow_batch(client, auth_headers, add_user('earlier'), [taken])
+
+    response = _borrow_batch(client, auth_headers, user_id, [free, taken, 999, free])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['borrowed'], body['failed']) == (1, 2)
+    assert [(r['book_id'], r['status']) for r in body['results']] == [
+        (free, 'borrowed'), (taken, 'unavailable'), (999, 'unavailable'),
+    ]
+    with app.app_context():
+        loan = db.session.execute(db.select(BorrowedBook).where(BorrowedBook.users_id == user_id)).scalar_one()
+        assert body['results'][0]['borrowed_book_id'] == loan.id
+        assert db.session.get(Books, free).available_count == 0
+
+
+def test_batch_return_reports_each_loan(app, client, auth_headers, add_books, add_user):
+    book_ids = add_books(2)
+    results = _borrow_batch(client, auth_headers, add_user('reader'), book_ids).get_json()['results']
+    first, second = (result['borrowed_book_id'] for result in results)
+    _return_batch(client, auth_headers, [second])
+
+    response = _return_batch(client, auth_headers, [first, second, 999])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['returned'], body['failed']) == (1, 2)
+    assert [(r['borrowed_book_id'], r['status']) for r in body['results']] == [
+        (first, 'returned'), (second, 'already_returned'), (999, 'not_found'),
+    ]
+    assert body['results'][0]['handed_off_to'] is None
+    with app.app_context():
+        assert [db.session.get(Books, book_id).available_count for book_id in book_ids] == [1, 1]
+
+
+def test_returned_copies_of_one_title_go_down_its_queue(app, client, auth_headers, add_books, add_user):
+    (book_id,) = add_books(1, total_copies=3, available_count=3)
+    loans = [
+        _borrow_batch(client, auth_headers, add_user(f'reader{i}'), [book_id]).get_json()['results'][0]['borrowed_book_id']
+        for i in range(3)
+    ]
+    first_in_line, second_in_line = add_user('first'), add_user('second')
+    _hold(client, auth_headers, first_in_line, book_id)
+    _hold(client, auth_headers, second_in_line, book_id)
+
+    body = _return_batch(client, auth_headers, loans).get_json()
+
+    assert [r['handed_off_to'] for r in body['results']] == [first_in_line, second_in_line, None]
+    with app.app_context():
+        book = db.session.get(Books, book_id)
+        assert (book.available_count, book.is_available) == (1, True)
+
+
+@pytest.mark.parametrize('body', [
+    {'user_id': 1},
+    {'user_id': 1, 'book_ids': []},
+    {'user_id': 1, 'book_ids': '1,2'},
+    {'user_id': 1, 'book_ids': [1, 'two']},
+    {'user_id': 1, 'book_ids': [True]},
+    {'user_id': 1, 'book_ids': list(range(1, 102))},
+    {'book_ids': [1]},
+])
+def test_batch_borrow_validates_the_id_list(client, auth_headers, add_books, body):
+    add_books(1)
+
+    assert client.post('/books/borrow/batch', json=body, headers=auth_headers).status_code == 400
+
+
+@pytest.mark.parametrize('loan_ids', [None, [], [1.5], list(range(1, 102))])
+def test_batch_return_validates_the_id_list(client, auth_headers, loan_ids):
+    assert _return_batch(client, auth_headers, loan_ids).status_code == 400
+
+
+def test_duplicate_ids_are_handled_once(client, auth_headers, add_books, add_user):
+    (book_id,) = add_books(1, total_copies=2, available_count=2)
+
+    body = _borrow_batch(client, auth_headers, add_user('reader'), [book_id, book_id]).get_json()
+
+    assert body['borrowed'] == 1 and len(body['results']) == 1
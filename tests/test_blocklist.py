@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from app import blocklist, db
+from app.blocklist import BloomFilter, MemoryBlocklistStore
+from app.models import RevokedToken
+
+
+@pytest.fixture(params=[
+    {'TOKEN_BLOCKLIST_BACKEND': 'memory'},
+    {'TOKEN_BLOCKLIST_BACKEND': 'sql', 'TOKEN_BLOCKLIST_SYNC_INTERVAL': '5'},
+    {'TOKEN_BLOCKLIST_BACKEND': 'sql', 'TOKEN_BLOCKLIST_SYNC_INTERVAL': '0'},
+], ids=['memory', 'sql-bloom', 'sql-direct'])
+def app_env(request):
+    return request.param
+
+
+def _jti(app, headers):
+    from flask_jwt_extended import decode_token
+
+    with app.app_context():
+        return decode_token(headers['Authorization'].split()[1])['jti']
+
+
+def test_logged_out_token_is_rejected(client, auth_headers):
+    assert client.get('/auth/protected', headers=auth_headers).status_code == 200
+
+    assert client.post('/auth/logout', headers=auth_headers).status_code == 200
+
+    assert client.get('/auth/protected', headers=auth_headers).status_code == 401
+    assert client.post('/auth/logout', headers=auth_headers).status_code == 401
+
+
+def test_other_tokens_stay_valid_after_a_logout(client, auth_headers):
+    other = client.post('/auth/login', json={'username': 'librarian', 'password': 'pw'}).get_json()['access_token']
+
+    client.post('/auth/logout', headers=auth_headers)
+
+    assert client.get('/auth/protected', headers={'Authorization': f'Bearer {other}'}).status_code == 200
+
+
+def test_revocation_by_another_worker_is_seen(app, client, auth_headers, app_env):
+    if app_env['TOKEN_BLOCKLIST_BACKEND'] != 'sql':
+        pytest.skip('the memory backend is per process')
+    client.get('/auth/protected', headers=auth_headers)  # Builds the Bloom filter before the revocation
+    with app.app_context():
+        db.session.add(RevokedToken(jti=_jti(app, auth_headers)))
+        db.session.commit()
+    blocklist._synced_at -= blocklist.sync_interval  # The next check is a sync
+
+    assert client.get('/auth/protected', headers=auth_headers).status_code == 401
+
+
+def test_memory_store_drops_expired_entries():
+    store = MemoryBlocklistStore()
+    now = time.time()
+    store.add('expired', now - 10)
+    store.add('live', now + 3600)
+    store.add('forever', None)
+
+    assert 'expired' not in store and 'live' in store and 'forever' in store
+    assert len(store) == 2
+    assert sorted(store.live_jtis()) == ['forever', 'live']
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000)
+    keys = [f'jti-{i}' for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f'other-{i}' in bloom for i in range(10_000))
+    assert false_positives < 300
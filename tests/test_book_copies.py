@@ -0,0 +1,51 @@
+import pytest
+
+from app import db
+from app.models import Books
+
+BAD_COPIES = ['x', '', None, 1.5, True, -1, [2]]
+NEW_BOOK = {'title': 'Dune', 'author': 'Frank Herbert', 'genre': 'Science Fiction', 'isbn': '9780441013593'}
+
+
+@pytest.mark.parametrize('copies', BAD_COPIES)
+def test_add_book_rejects_invalid_copies(app, client, auth_headers, copies):
+    response = client.post('/books/', json={**NEW_BOOK, 'copies': copies}, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'copies must be a non-negative integer'
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(Books)) == 0
+
+
+@pytest.mark.parametrize('copies', BAD_COPIES)
+def test_update_book_rejects_invalid_copies(app, client, auth_headers, add_books, copies):
+    (book_id,) = add_books(1, total_copies=2, available_count=2)
+
+    response = client.put(f'/books/{book_id}', json={'title': 'Renamed', 'copies': copies}, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'copies must be a non-negative integer'
+    with app.app_context():
+        book = db.session.get(Books, book_id)
+        assert book.title != 'Renamed'
+        assert (book.total_copies, book.available_count) == (2, 2)
+
+
+def test_shrinking_below_the_copies_on_loan_is_refused(app, client, auth_headers, add_books, add_user):
+    (book_id,) = add_books(1, total_copies=2, available_count=2)
+    for name in ('first', 'second'):
+        client.post('/books/borrow', json={'user_id': add_user(name), 'book_id': book_id}, headers=auth_headers)
+
+    response = client.put(f'/books/{book_id}', json={'copies': 1}, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'copies cannot be fewer than the copies on loan'
+
+
+@pytest.mark.parametrize('copies, expected', [(3, 3), ('4', 4), (2.0, 2), (0, 0)])
+def test_whole_copy_counts_are_accepted(app, client, auth_headers, copies, expected):
+    assert client.post('/books/', json={**NEW_BOOK, 'copies': copies}, headers=auth_headers).status_code == 201
+
+    with app.app_context():
+        book = db.session.scalars(db.select(Books)).one()
+        assert (book.total_copies, book.available_count, book.is_available) == (expected, expected, expected > 0)
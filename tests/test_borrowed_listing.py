@@ -0,0 +1,24 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import BorrowedBook
+
+
+@pytest.mark.parametrize('loans', [1, 5, 40])
+def test_list_borrowed_books_query_count_is_constant(app, client, auth_headers, add_books, add_user, loans):
+    app.config['SQL_QUERY_BUDGET_RAISE'] = True  # @query_budget(2) on the view now fails the request
+    user_id = add_user('reader')
+    book_ids = add_books(loans)
+    now = datetime.now()
+    with app.app_context():
+        db.session.add_all(BorrowedBook(users_id=user_id, books_id=book_id, borrow_date=now,
+                                        due_date=now + timedelta(days=14)) for book_id in book_ids)
+        db.session.commit()
+
+    response = client.get(f'/books/borrowed/{user_id}', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == loans
+    assert 'desc="1 queries"' in response.headers['Server-Timing']
@@ -0,0 +1,22 @@
+from app.routes import books
+
+
+def test_non_string_field_is_reported_as_a_row_error(client, auth_headers, monkeypatch):
+    # A small batch size so the bad row arrives after a batch has already been committed
+    monkeypatch.setattr(books, 'BULK_BATCH_SIZE', 1)
+    records = [
+        {'title': 'Compilers', 'author': 'Aho', 'isbn': '978-0-306-40615-7'},
+        {'title': 1984, 'author': 'Orwell', 'isbn': '978-0-13-110362-7'},
+        {'title': 'Dune', 'author': ['Herbert'], 'isbn': '0-306-40615-2'},
+    ]
+
+    response = client.post('/books/bulk', json=records, headers=auth_headers)
+
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report['inserted'] == 1
+    assert report['failed'] == 2
+    assert [(e['row'], e['error']) for e in report['errors']] == [
+        (2, 'title must be a string'),
+        (3, 'author must be a string'),
+    ]
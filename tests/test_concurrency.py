@@ -0,0 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db
+from app.models import BorrowedBook, Books
+
+BORROWERS = 24
+
+
+def test_concurrent_borrows_never_overdraw_copies(app, auth_headers, add_books, add_user):
+    (book_id,) = add_books(1, total_copies=5, available_count=5)
+    user_ids = [add_user(f'reader{i}') for i in range(BORROWERS)]
+
+    def borrow(user_id):
+        # Each thread gets its own client, so its own request context and database connection
+        return app.test_client().post('/books/borrow', json={'user_id': user_id, 'book_id': book_id},
+                                      headers=auth_headers).status_code
+
+    with ThreadPoolExecutor(max_workers=BORROWERS) as executor:
+        statuses = list(executor.map(borrow, user_ids))
+
+    assert statuses.count(200) == 5
+    assert statuses.count(404) == BORROWERS - 5
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(BorrowedBook)) == 5
+        book = db.session.get(Books, book_id)
+        assert book.available_count == 0
+        assert book.is_available is False
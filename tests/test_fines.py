@@ -0,0 +1,73 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.commands import compute_fines
+from app.models import BorrowedBook, FineLedger
+
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+RATES = {'default': {'rate': 1, 'cap': None}, 'rare': {'rate': 2.5, 'cap': 10}, 'reference': {'rate': 3, 'cap': 0}}
+
+
+def test_fines_use_per_genre_rates_and_caps():
+    due = [NOW - timedelta(days=days) for days in (3, 3, 30, 3, 3)]
+    genres = ['fiction', 'rare', 'rare', 'reference', None]
+
+    days, amounts = compute_fines(due, [None] * 5, genres, RATES, NOW)
+
+    assert days.tolist() == [3, 3, 30, 3, 3]
+    assert amounts.tolist() == [3.0, 7.5, 10.0, 0.0, 3.0]
+
+
+def test_fines_count_whole_days_and_stop_at_the_return_date():
+    due = [NOW - timedelta(hours=23), NOW - timedelta(hours=49), NOW + timedelta(days=2), NOW - timedelta(days=10)]
+    returned = [None, None, None, NOW - timedelta(days=6)]
+
+    days, amounts = compute_fines(due, returned, ['fiction'] * 4, RATES, NOW)
+
+    assert days.tolist() == [0, 2, 0, 4]
+    assert amounts.tolist() == [0.0, 2.0, 0.0, 4.0]
+
+
+def test_genre_without_a_rate_falls_back_to_the_default_rate():
+    rates = {'default': {'rate': 0.3}, 'kids': {'cap': 1}}
+
+    _, amounts = compute_fines([NOW - timedelta(days=7)] * 2, [None] * 2, ['kids', 'other'], rates, NOW)
+
+    assert amounts.tolist() == [1.0, 2.1]
+
+
+@pytest.fixture
+def loans(app, add_books, add_user):
+    book_ids = add_books(3)
+    user_id = add_user('reader')
+    now = datetime.now()
+    with app.app_context():
+        loans = [BorrowedBook(users_id=user_id, books_id=book_id, borrow_date=now - timedelta(days=20),
+                              due_date=now - timedelta(days=5)) for book_id in book_ids]
+        db.session.add_all(loans)
+        db.session.commit()
+        return [loan.id for loan in loans]
+
+
+def _accrue(app, rates):
+    result = app.test_cli_runner().invoke(args=['accrue-fines', '--rates', json.dumps(rates)])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        return {row.borrowed_book_id: float(row.amount) for row in db.session.scalars(db.select(FineLedger))}
+
+
+def test_accrual_updates_and_clears_ledger_rows(app, loans):
+    first, second, third = loans
+    assert _accrue(app, {'default': {'rate': 1}}) == {first: 5.0, second: 5.0, third: 5.0}
+
+    assert _accrue(app, {'default': {'rate': 2}}) == {first: 10.0, second: 10.0, third: 10.0}
+
+    with app.app_context():
+        db.session.get(BorrowedBook, second).due_date = datetime.now() + timedelta(days=3)
+        db.session.commit()
+    assert _accrue(app, {'default': {'rate': 2}}) == {first: 10.0, third: 10.0}
+
+    assert _accrue(app, {'default': {'rate': 2, 'cap': 0}}) == {}
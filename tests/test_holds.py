@@ -0,0 +1,78 @@
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import db
+from app.models import BookHold, BorrowedBook, Books
+
+
+def _borrow(client, headers, user_id, book_id):
+    return client.post('/books/borrow', json={'user_id': user_id, 'book_id': book_id}, headers=headers)
+
+
+def test_added_copies_go_to_waiting_holds_before_walk_ins(app, client, auth_headers, add_books, add_user):
+    (book_id,) = add_books(1, total_copies=1, available_count=1)
+    first, waiting, walk_in = (add_user(name) for name in ('first', 'waiting', 'walk_in'))
+
+    assert _borrow(client, auth_headers, first, book_id).status_code == 200
+    hold = client.post(f'/books/{book_id}/hold', json={'user_id': waiting}, headers=auth_headers)
+    assert hold.status_code == 201
+
+    assert client.put(f'/books/{book_id}', json={'copies': 2}, headers=auth_headers).status_code == 200
+    assert _borrow(client, auth_headers, walk_in, book_id).status_code == 404
+
+    with app.app_context():
+        assert db.session.get(BookHold, hold.get_json()['hold_id']).status == 'fulfilled'
+        borrowers = db.session.scalars(db.select(BorrowedBook.users_id).order_by(BorrowedBook.id)).all()
+        assert borrowers == [first, waiting]
+        book = db.session.get(Books, book_id)
+        assert (book.total_copies, book.available_count, book.is_available) == (2, 0, False)
+
+
+def test_extra_copies_beyond_the_queue_stay_on_the_shelf(app, client, auth_headers, add_books, add_user):
+    (book_id,) = add_books(1, total_copies=1, available_count=1)
+    first, waiting, walk_in = (add_user(name) for name in ('first', 'waiting', 'walk_in'))
+    _borrow(client, auth_headers, first, book_id)
+    client.post(f'/books/{book_id}/hold', json={'user_id': waiting}, headers=auth_headers)
+
+    client.put(f'/books/{book_id}', json={'copies': 3}, headers=auth_headers)
+
+    assert _borrow(client, auth_headers, walk_in, book_id).status_code == 200
+    with app.app_context():
+        book = db.session.get(Books, book_id)
+        assert (book.total_copies, book.available_count, book.is_available) == (3, 0, False)
+
+
+def test_copy_returned_while_a_hold_is_placed_goes_to_the_hold(app, client, auth_headers, add_books, add_user):
+    (book_id,) = add_books(1, total_copies=1, available_count=1)
+    first, waiting = add_user('first'), add_user('waiting')
+    _borrow(client, auth_headers, first, book_id)
+    with app.app_context():
+        engine = db.engine
+
+    # The return commits on another connection after place_hold has read available_count == 0,
+    # and, seeing no hold yet, shelves the copy
+    returned = []
+
+    def return_first(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT INTO book_hold') and not returned:
+            returned.append(True)
+            with engine.begin() as other:
+                other.execute(db.update(BorrowedBook).values(return_date=datetime.now()))
+                other.execute(db.update(Books).values(available_count=1, is_available=True))
+
+    event.listen(engine, 'before_cursor_execute', return_first)
+    try:
+        hold = client.post(f'/books/{book_id}/hold', json={'user_id': waiting}, headers=auth_headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', return_first)
+
+    assert returned
+    assert hold.status_code == 201
+    assert hold.get_json()['handed_off_to'] == [waiting]
+    with app.app_context():
+        assert db.session.get(BookHold, hold.get_json()['hold_id']).status == 'fulfilled'
+        book = db.session.get(Books, book_id)
+        assert (book.available_count, book.is_available) == (0, False)
+        open_loans = db.session.scalars(db.select(BorrowedBook.users_id).where(BorrowedBook.return_date.is_(None))).all()
+        assert open_loans == [waiting]
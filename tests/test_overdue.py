@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import BorrowedBook
+from app.routes import books
+
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+
+# Days past due, including fractions either side of whole-day boundaries
+OVERDUE_DAYS = [0.25, 0.999, 1, 1.001, 2.5, 3.999, 10.3, 45.75]
+NOT_DUE_DAYS = [-0.5, -3]
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW
+
+
+@pytest.fixture(autouse=True)
+def frozen_now(monkeypatch):
+    monkeypatch.setattr(books, 'datetime', FrozenDatetime)
+
+
+@pytest.fixture
+def add_loans(app, add_books, add_user):
+    def add_loans(days_late):
+        book_ids = add_books(len(days_late))
+        user_id = add_user('reader')
+        with app.app_context():
+            loans = [BorrowedBook(users_id=user_id, books_id=book_id, borrow_date=NOW - timedelta(days=60),
+                                  due_date=NOW - timedelta(seconds=round(days * 86400)))
+                     for book_id, days in zip(book_ids, days_late)]
+            db.session.add_all(loans)
+            db.session.commit()
+            return [loan.id for loan in loans]
+
+    return add_loans
+
+
+def test_sql_fines_match_the_python_calculation(app, client, auth_headers, add_loans):
+    add_loans(OVERDUE_DAYS + NOT_DUE_DAYS)
+
+    response = client.get('/books/overdue?fine_per_day=2.5&limit=100', headers=auth_headers)
+
+    assert response.status_code == 200
+    reported = {row['id']: row for row in response.get_json()['loans']}
+    with app.app_context():
+        loans = db.session.scalars(db.select(BorrowedBook)).all()
+        assert set(reported) == {loan.id for loan in loans if loan.is_overdue(NOW)}
+        assert len(reported) == len(OVERDUE_DAYS)
+        for loan in loans:
+            if loan.id in reported:
+                assert reported[loan.id]['days_overdue'] == (NOW - loan.due_date).days
+                assert reported[loan.id]['fine'] == loan.calculate_fine(2.5, NOW)
+
+
+def test_sql_and_python_agree_on_what_is_overdue(app, add_loans):
+    add_loans(OVERDUE_DAYS + NOT_DUE_DAYS + [0])
+
+    with app.app_context():
+        loans = db.session.scalars(db.select(BorrowedBook)).all()
+        in_sql = set(db.session.scalars(db.select(BorrowedBook.id).where(BorrowedBook.is_overdue(NOW))))
+        fines = dict(db.session.execute(db.select(BorrowedBook.id, BorrowedBook.calculate_fine(3, NOW))).all())
+
+        assert in_sql == {loan.id for loan in loans if loan.is_overdue(NOW)}
+        assert fines == {loan.id: loan.calculate_fine(3, NOW) for loan in loans}
+
+
+def test_overdue_pages_follow_due_date_then_id(client, auth_headers, add_loans):
+    # Repeated due dates make the id part of the cursor matter
+    ids = add_loans([5, 2, 5, 9, 2, 5, 1])
+    expected = [loan_id for _, loan_id in sorted(zip([-5, -2, -5, -9, -2, -5, -1], ids))]
+
+    seen, after = [], None
+    while True:
+        url = '/books/overdue?limit=2' + (f'&after={after}' if after else '')
+        body = client.get(url, headers=auth_headers).get_json()
+        assert len(body['loans']) <= 2
+        seen.extend(row['id'] for row in body['loans'])
+        after = body['next_cursor']
+        if after is None:
+            break
+
+    assert seen == expected
@@ -0,0 +1,114 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models import BorrowedBook
+
+NDJSON = {'Accept': 'application/x-ndjson'}
+
+
+def _walk(client, headers, url, key):
+    pages, after = [], None
+    while True:
+        response = client.get(url + (f'&after={after}' if after else ''), headers=headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        pages.append(body[key])
+        after = body['next_cursor']
+        if after is None:
+            return pages
+
+
+def test_book_pages_cover_the_catalog_once(client, auth_headers, add_books):
+    ids = add_books(7)
+
+    pages = _walk(client, auth_headers, '/books/?limit=3&fields=id,title', 'books')
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [book['id'] for page in pages for book in page] == ids
+    assert set(pages[0][0]) == {'id', 'title'}
+
+
+def test_last_full_page_has_no_cursor(client, auth_headers, add_books):
+    add_books(4)
+
+    pages = _walk(client, auth_headers, '/books/?limit=2', 'books')
+
+    assert [len(page) for page in pages] == [2, 2]
+
+
+def test_loan_pages_follow_the_id_order(app, client, auth_headers, add_books, add_user):
+    book_ids = add_books(5)
+    user_id = add_user('reader')
+    for book_id in book_ids:
+        client.post('/books/borrow', json={'user_id': user_id, 'book_id': book_id}, headers=auth_headers)
+
+    pages = _walk(client, auth_headers, f'/books/borrowed?user={user_id}&limit=2', 'loans')
+
+    assert [loan['books_id'] for page in pages for loan in page] == book_ids
+
+
+def test_date_filtered_loan_pages_follow_the_borrow_date_order(app, client, auth_headers, add_books, add_user):
+    book_ids = add_books(5)
+    user_id = add_user('reader')
+    for book_id in book_ids:
+        client.post('/books/borrow', json={'user_id': user_id, 'book_id': book_id}, headers=auth_headers)
+    # Later loans borrowed earlier, with a tie that the id breaks
+    dates = [datetime(2026, 3, 1), datetime(2026, 2, 1), datetime(2026, 2, 1), datetime(2026, 1, 15), datetime(2025, 12, 1)]
+    with app.app_context():
+        for book_id, borrow_date in zip(book_ids, dates):
+            db.session.execute(
+                db.update(BorrowedBook).where(BorrowedBook.books_id == book_id).values(borrow_date=borrow_date)
+            )
+        db.session.commit()
+
+    pages = _walk(client, auth_headers, '/books/borrowed?borrowed_after=2026-01-01&limit=2', 'loans')
+
+    assert [len(page) for page in pages] == [2, 2]
+    assert [loan['books_id'] for page in pages for loan in page] == [book_ids[3], book_ids[1], book_ids[2], book_ids[0]]
+
+
+@pytest.mark.parametrize('query', ['limit=abc', 'limit=0', 'limit=-5', 'limit=2&after=not-a-cursor'])
+def test_invalid_page_arguments_are_rejected(client, auth_headers, add_books, query):
+    add_books(3)
+
+    response = client.get(f'/books/?{query}', headers=auth_headers)
+
+    assert response.status_code == 400
+
+
+def test_limit_is_capped(client, auth_headers, add_books):
+    add_books(3)
+
+    response = client.get('/books/?limit=100000', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(response.get_json()['books']) == 3
+
+
+def test_ndjson_streams_one_book_per_line(client, auth_headers, add_books):
+    ids = add_books(5)
+
+    response = client.get('/books/?fields=id,isbn', headers={**auth_headers, **NDJSON})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {'id': book_id, 'isbn': str(9780000000000 + i)} for i, book_id in enumerate(ids)
+    ]
+
+
+def test_ndjson_streams_loans(client, auth_headers, add_books, add_user):
+    book_ids = add_books(2)
+    user_id = add_user('reader')
+    for book_id in book_ids:
+        client.post('/books/borrow', json={'user_id': user_id, 'book_id': book_id}, headers=auth_headers)
+
+    response = client.get(f'/books/borrowed?user={user_id}&fields=books_id', headers={**auth_headers, **NDJSON})
+
+    assert [json.loads(line) for line in response.get_data(as_text=True).splitlines()] == [
+        {'books_id': book_id} for book_id in book_ids
+    ]
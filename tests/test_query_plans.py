@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.routes.books import _encode_cursor
+
+OVERDUE_INDEXES = ('ix_borrowed_book_open_due_date', 'ix_borrowed_book_return_date_due_date')
+
+# The loan listings must search one of borrowed_book's indexes and read rows in
+# index order; a "SCAN borrowed_book" or a temp B-tree sort grows with the loan history.
+CASES = [
+    ('/books/borrowed/1', ('ix_borrowed_book_users_id_return_date',)),
+    ('/books/overdue', OVERDUE_INDEXES),
+    (f"/books/overdue?after={_encode_cursor('2026-01-01T00:00:00', 1)}", OVERDUE_INDEXES),
+    ('/books/borrowed?user=1', ('ix_borrowed_book_users_id_id',)),
+    ('/books/borrowed?user=1&limit=10', ('ix_borrowed_book_users_id_id',)),
+    ('/books/borrowed?open_only=true&limit=10', ('ix_borrowed_book_open_id',)),
+    (f"/books/borrowed?open_only=true&limit=10&after={_encode_cursor(1)}", ('ix_borrowed_book_open_id',)),
+    ('/books/borrowed?borrowed_after=2026-01-01&limit=10', ('ix_borrowed_book_borrow_date_id',)),
+    (f"/books/borrowed?borrowed_after=2026-01-01&limit=10&after={_encode_cursor('2026-01-02T00:00:00', 1)}",
+     ('ix_borrowed_book_borrow_date_id',)),
+    ('/books/borrowed?borrowed_after=2026-01-01&borrowed_before=2026-02-01', ('ix_borrowed_book_borrow_date_id',)),
+]
+
+
+def _query_plan(app, client, headers, url):
+    # Explains the borrowed_book statement the route actually issued, with its parameters
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM borrowed_book' in statement:
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    assert response.status_code == 200, response.get_json()
+    assert len(statements) == 1
+
+    statement, parameters = statements[0]
+    with engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+
+
+@pytest.mark.parametrize('url, indexes', CASES)
+def test_loan_listings_search_an_index(app, client, auth_headers, url, indexes):
+    plan = _query_plan(app, client, auth_headers, url)
+
+    loan_steps = [step for step in plan if 'borrowed_book' in step]
+    assert len(loan_steps) == 1, plan
+    assert loan_steps[0].startswith('SEARCH borrowed_book USING'), plan
+    assert any(index in loan_steps[0] for index in indexes), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
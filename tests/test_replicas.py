@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+
+from app import create_app, db
+from app.metrics import TimedQueuePool
+from app.replicas import STICKY_COOKIE
+
+
+@pytest.fixture
+def app_env(tmp_path):
+    return {'DATABASE_REPLICA_URIS': f"sqlite:///{tmp_path / 'replica.db'}"}
+
+
+def _snapshot_replica(tmp_path):
+    # Stands in for replication catching up: the replica becomes a copy of the primary as of now
+    with sqlite3.connect(tmp_path / 'library.db') as primary, sqlite3.connect(tmp_path / 'replica.db') as replica:
+        primary.backup(replica)
+
+
+def test_replica_engines_get_the_primary_pool_options(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URI', f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setenv('DATABASE_REPLICA_URIS', f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setenv('DB_POOL_SIZE', '3')
+    monkeypatch.setenv('DB_MAX_OVERFLOW', '2')
+    monkeypatch.setenv('DB_POOL_TIMEOUT', '7')
+    app = create_app()
+
+    with app.app_context():
+        primary, replica = db.engines[None].pool, db.engines['replica_0'].pool
+        try:
+            for pool in (primary, replica):
+                assert isinstance(pool, TimedQueuePool)
+                assert (pool.size(), pool._max_overflow, pool._timeout) == (3, 2, 7)
+            assert (primary._metrics_name, replica._metrics_name) == ('primary', 'replica_0')
+        finally:
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+def test_writers_read_their_writes_while_others_read_the_replica(app, client, auth_headers, add_books, tmp_path):
+    (book_id,) = add_books(1)
+    _snapshot_replica(tmp_path)
+
+    assert client.put(f'/books/{book_id}', json={'title': 'Renamed'}, headers=auth_headers).status_code == 200
+    assert client.get_cookie(STICKY_COOKIE) is not None
+
+    # The writer is kept on the primary and sees its change; anyone else reads the lagging replica
+    assert client.get(f'/books/{book_id}', headers=auth_headers).get_json()['title'] == 'Renamed'
+    assert app.test_client().get(f'/books/{book_id}', headers=auth_headers).get_json()['title'] == 'Book 0'
+
+    _snapshot_replica(tmp_path)
+    assert app.test_client().get(f'/books/{book_id}', headers=auth_headers).get_json()['title'] == 'Renamed'
@@ -0,0 +1,122 @@
+import time
+
+import pytest
+
+from app import db, response_cache
+from app.models import BorrowedBook
+
+
+@pytest.fixture
+def app_env(tmp_path):
+    # The replica is the primary's own file, so routing works and reads stay consistent
+    return {'CATALOG_CACHE_SIZE': '16', 'DATABASE_REPLICA_URIS': f"sqlite:///{tmp_path / 'library.db'}"}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(app):
+    response_cache.bump()
+
+
+@pytest.fixture
+def reader(app):
+    # auth_headers registers a user through `client`, which leaves that client sticky to the primary
+    return app.test_client()
+
+
+def _counts():
+    return response_cache.hits, response_cache.misses
+
+
+def test_repeat_reads_are_served_from_the_cache(reader, auth_headers, add_books):
+    add_books(3)
+    hits, misses = _counts()
+
+    first = reader.get('/books/', headers=auth_headers)
+    second = reader.get('/books/', headers=auth_headers)
+
+    assert _counts() == (hits + 1, misses + 1)
+    assert second.get_data() == first.get_data()
+    assert second.headers['ETag'] == first.headers['ETag']
+
+
+def test_matching_etag_gets_304(reader, auth_headers, add_books):
+    (book_id,) = add_books(1)
+    etag = reader.get(f'/books/{book_id}', headers=auth_headers).headers['ETag']
+
+    response = reader.get(f'/books/{book_id}', headers={**auth_headers, 'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert reader.get(f'/books/{book_id}', headers={**auth_headers, 'If-None-Match': '"stale"'}).status_code == 200
+
+
+def _borrow(client, headers, book_id, user_id):
+    return client.post('/books/borrow', json={'user_id': user_id, 'book_id': book_id}, headers=headers)
+
+
+WRITES = {
+    'add': lambda client, h, book_id, user_id: client.post(
+        '/books/', json={'title': 'New', 'author': 'A', 'genre': 'g', 'isbn': '9780306406157'}, headers=h),
+    'bulk': lambda client, h, book_id, user_id: client.post(
+        '/books/bulk', json=[{'title': 'New', 'author': 'A', 'isbn': '9780306406157'}], headers=h),
+    'update': lambda client, h, book_id, user_id: client.put(f'/books/{book_id}', json={'title': 'Renamed'}, headers=h),
+    'delete': lambda client, h, book_id, user_id: client.delete(f'/books/{book_id}', headers=h),
+    'borrow': lambda client, h, book_id, user_id: _borrow(client, h, book_id, user_id),
+    'borrow_batch': lambda client, h, book_id, user_id: client.post(
+        '/books/borrow/batch', json={'user_id': user_id, 'book_ids': [book_id]}, headers=h),
+}
+
+
+@pytest.mark.parametrize('write', WRITES.values(), ids=WRITES.keys())
+def test_writes_drop_cached_pages(client, reader, auth_headers, add_books, add_user, write):
+    (book_id,) = add_books(1)
+    user_id = add_user('reader')
+    before = reader.get('/books/', headers=auth_headers)
+    assert reader.get('/books/', headers=auth_headers).headers['ETag'] == before.headers['ETag']
+
+    response = write(client, auth_headers, book_id, user_id)
+    assert response.status_code in (200, 201)
+
+    after = reader.get('/books/', headers=auth_headers)
+    assert after.get_data() != before.get_data()
+    assert after.headers['ETag'] != before.headers['ETag']
+
+
+@pytest.mark.parametrize('route', ['/books/return', '/books/return/batch'])
+def test_returns_drop_cached_pages(app, client, reader, auth_headers, add_books, add_user, route):
+    (book_id,) = add_books(1)
+    _borrow(client, auth_headers, book_id, add_user('reader'))
+    with app.app_context():
+        loan_id = db.session.scalar(db.select(BorrowedBook.id))
+    before = reader.get(f'/books/{book_id}', headers=auth_headers).get_json()
+
+    body = {'borrowed_book_id': loan_id} if route == '/books/return' else {'borrowed_book_ids': [loan_id]}
+    assert client.post(route, json=body, headers=auth_headers).status_code == 200
+
+    after = reader.get(f'/books/{book_id}', headers=auth_headers).get_json()
+    assert (before['available_count'], after['available_count']) == (0, 1)
+
+
+def test_ndjson_reads_bypass_the_cache(reader, auth_headers, add_books):
+    add_books(2)
+    counts = _counts()
+
+    for _ in range(2):
+        response = reader.get('/books/', headers={**auth_headers, 'Accept': 'application/x-ndjson'})
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+        assert len(response.get_data(as_text=True).splitlines()) == 2
+
+    assert _counts() == counts
+
+
+def test_sticky_clients_bypass_the_cache(reader, auth_headers, add_books):
+    (book_id,) = add_books(1)
+    reader.set_cookie('primary_until', f'{time.time() + 60:.3f}')
+    counts = _counts()
+
+    for url in ('/books/', f'/books/{book_id}'):
+        assert reader.get(url, headers=auth_headers).status_code == 200
+
+    assert _counts() == counts
+    assert len(response_cache._entries) == 0
@@ -0,0 +1,115 @@
+import random
+
+from app import db
+from app.models import Books
+from app.search import BM25Index, PrefixIndex, catalog_index, suggest_index
+
+
+def _brute_force(terms, prefix, k):
+    # terms: {norm: (text, score)}
+    matches = [norm for norm in terms if norm.startswith(prefix.lower())]
+    matches.sort(key=lambda norm: (-terms[norm][1], norm))
+    return [{'text': terms[norm][0], 'popularity': terms[norm][1]} for norm in matches[:k]]
+
+
+def test_prefix_index_matches_brute_force_through_adds_and_removals():
+    rng = random.Random(7)
+    index, terms = PrefixIndex(k=3, depth=3), {}
+    words = [''.join(rng.choice('abc') for _ in range(rng.randint(1, 6))) for _ in range(60)]
+    prefixes = sorted({word[:n] for word in words for n in range(1, len(word) + 1)})
+    for step in range(400):
+        word = rng.choice(words)
+        if word in terms and rng.random() < 0.4:
+            index.adjust(word, -terms.pop(word)[1], -1)
+        else:
+            score = rng.randint(0, 5)
+            index.adjust(word, score, 0 if word in terms else 1)
+            terms[word] = (word, terms.get(word, (word, 0))[1] + score)
+        # Query a few prefixes every step so stale cached top-k lists would be caught
+        for prefix in rng.sample(prefixes, 5):
+            assert index.suggest(prefix) == _brute_force(terms, prefix, 3), (step, prefix)
+
+
+def test_removing_the_last_term_prunes_its_prefix_nodes():
+    index = PrefixIndex(k=5, depth=4)
+    index.adjust('ab', 1, 1)
+    index.adjust('abcdef', 1, 1)
+    index.adjust('xy', 1, 1)
+
+    index.adjust('abcdef', -1, -1)
+    assert 'abc' not in index._children and 'abcd' not in index._buckets
+    assert index._children['ab'] == set()
+    assert index.suggest('abc') == []
+
+    index.adjust('ab', -1, -1)
+    assert set(index._children) == {'', 'x'}
+    assert index._children[''] == {'x'}
+    assert list(index._buckets) == ['xy']
+    assert index.suggest('a') == []
+
+
+def test_cached_top_k_follows_score_changes():
+    index = PrefixIndex(k=2, depth=2)
+    for text in ('Alpha', 'Alps', 'Altitude'):
+        index.adjust(text, 1, 1)
+    assert [s['text'] for s in index.suggest('al')] == ['Alpha', 'Alps']
+
+    index.adjust('Altitude', 5)
+    assert [s['text'] for s in index.suggest('a')] == ['Altitude', 'Alpha']
+    assert [s['text'] for s in index.suggest('alt')] == ['Altitude']
+
+    index.adjust('Altitude', -5, -1)
+    assert [s['text'] for s in index.suggest('al')] == ['Alpha', 'Alps']
+
+
+def test_references_keep_a_shared_string_until_the_last_is_removed():
+    index = PrefixIndex()
+    index.adjust('Dune', 2, 1)
+    index.adjust('dune ', 3, 1)
+
+    assert index.suggest('du') == [{'text': 'Dune', 'popularity': 5}]
+    index.adjust('Dune', -2, -1)
+    assert index.suggest('du') == [{'text': 'Dune', 'popularity': 3}]
+    index.adjust('Dune', -3, -1)
+    assert index.suggest('du') == []
+
+
+def test_writes_during_a_rebuild_are_replayed(app):
+    index = BM25Index()
+    original_load = BM25Index._load
+
+    class RacingIndex(BM25Index):
+        def _load(self, db, model):
+            original_load(self, db, model)
+            # A write from this process lands after the rebuild read the table
+            index.update(99, 'late arrival')
+
+    index._spawn = lambda: RacingIndex()
+    with app.app_context():
+        index.ensure_loaded(db, Books)
+
+    assert [doc_id for doc_id, _ in index.search('arrival', 5)] == [99]
+
+
+def _add_book_elsewhere(app, title):
+    # Written straight to the database, as another worker process would
+    with app.app_context():
+        db.session.add(Books(title=title, author='Frank Herbert', genre='scifi', isbn='9780441013593',
+                             is_available=True))
+        db.session.commit()
+
+
+def test_indexes_pick_up_other_workers_writes_after_the_ttl(app, client, auth_headers, add_books):
+    add_books(2)
+    assert client.get('/books/search?q=dune', headers=auth_headers).get_json()['books'] == []
+    assert client.get('/books/suggest?prefix=dun', headers=auth_headers).get_json()['titles'] == []
+
+    _add_book_elsewhere(app, 'Dune')
+    assert client.get('/books/search?q=dune', headers=auth_headers).get_json()['books'] == []
+
+    for index in (catalog_index, suggest_index):
+        index._loaded_at -= app.config['SEARCH_INDEX_TTL']
+    assert [b['title'] for b in client.get('/books/search?q=dune', headers=auth_headers).get_json()['books']] == ['Dune']
+    assert client.get('/books/suggest?prefix=dun', headers=auth_headers).get_json()['titles'] == [
+        {'text': 'Dune', 'popularity': 0}
+    ]